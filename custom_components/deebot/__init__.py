@@ -8,18 +8,27 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_DEVICES, CONF_USERNAME, CONF_VERIFY_SSL, Platform
 from homeassistant.const import __version__ as HA_VERSION
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 
 from custom_components.deebot.controller import DeebotController
 
+from .connection import async_get_connection_manager
 from .const import (
     CONF_BUMPER,
     CONF_CLIENT_DEVICE_ID,
+    DATA_CONNECTIONS,
     DOMAIN,
     INTEGRATION_VERSION,
     MIN_REQUIRED_HA_VERSION,
     STARTUP_MESSAGE,
+    STORAGE_KEY_SNAPSHOT,
+    STORAGE_VERSION_SNAPSHOT,
 )
+from .services import async_setup_services
 from .util import get_bumper_device_id
+from .websocket_api import async_setup as async_setup_websocket_api
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,6 +43,8 @@ PLATFORMS = [
     Platform.VACUUM,
 ]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
 
 def is_ha_supported() -> bool:
     """Return True, if current HA version is supported."""
@@ -47,6 +58,13 @@ def is_ha_supported() -> bool:
     return False
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the deebot component."""
+    async_setup_websocket_api(hass)
+    async_setup_services(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up this integration using UI."""
 
@@ -62,7 +80,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     # Store an instance of the "connecting" class that does the work of speaking
     # with your actual devices.
-    controller = DeebotController(hass, {**entry.data, **entry.options})
+    await async_get_connection_manager(hass).async_load()
+    controller = DeebotController(hass, {**entry.data, **entry.options}, entry.entry_id)
     await controller.initialize()
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = controller
@@ -89,15 +108,25 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok:
         await hass.data[DOMAIN][entry.entry_id].teardown()
         hass.data[DOMAIN].pop(entry.entry_id)
-        if len(hass.data[DOMAIN]) == 0:
+        if hass.data[DOMAIN].keys() <= {DATA_CONNECTIONS}:
             hass.data.pop(DOMAIN)
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored data of a config entry."""
+    await Store(
+        hass, STORAGE_VERSION_SNAPSHOT, STORAGE_KEY_SNAPSHOT.format(entry.entry_id)
+    ).async_remove()
+    await async_get_connection_manager(hass).async_remove_entry(entry)
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload the config entry when it changed."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Apply the changed devices or reload the config entry when it changed."""
+    controller: DeebotController = hass.data[DOMAIN][entry.entry_id]
+    if not await controller.async_update_config({**entry.data, **entry.options}):
+        await hass.config_entries.async_reload(entry.entry_id)
 
 
 async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
@@ -10,9 +10,11 @@ from homeassistant.components.binary_sensor import (
     BinarySensorEntityDescription,
 )
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import STATE_OFF, STATE_ON
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import DOMAIN
 from .controller import DeebotController
@@ -56,9 +58,17 @@ async def async_setup_entry(
     )
 
 
-class DeebotBinarySensor(DeebotEntity[CapabilityEvent[EventT], DeebotBinarySensorEntityDescription], BinarySensorEntity):  # type: ignore
+class DeebotBinarySensor(DeebotEntity[CapabilityEvent[EventT], DeebotBinarySensorEntityDescription], BinarySensorEntity, RestoreEntity):  # type: ignore
     """Deebot binary sensor."""
 
+    async def _async_restore_state(self) -> None:
+        """Restore the last known state."""
+        if (last_state := await self.async_get_last_state()) is not None and (
+            last_state.state in (STATE_ON, STATE_OFF)
+        ):
+            self._attr_is_on = last_state.state == STATE_ON
+            self._attr_icon = self.entity_description.icon_fn(self._attr_is_on)
+
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
         await super().async_added_to_hass()
@@ -66,8 +76,6 @@ class DeebotBinarySensor(DeebotEntity[CapabilityEvent[EventT], DeebotBinarySenso
         async def on_event(event: EventT) -> None:
             self._attr_is_on = self.entity_description.value_fn(event)
             self._attr_icon = self.entity_description.icon_fn(self._attr_is_on)
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
-        self.async_on_remove(
-            self._device.events.subscribe(self._capability.event, on_event)
-        )
+        self.async_on_remove(self._events.subscribe(self._capability.event, on_event))
@@ -0,0 +1,36 @@
+"""Bot module."""
+from deebot_client.device import Device
+
+from .command_queue import DeebotCommandQueue
+from .device_map import DeviceMap
+from .event_router import DeebotEventRouter
+
+
+class DeebotBot:
+    """Bot and the objects, which live as long as the bot is set up.
+
+    The controller owns the bots, so everything is released together with the bot.
+    """
+
+    def __init__(
+        self,
+        device: Device,
+        *,
+        restore_state: bool = False,
+        map_watchdog_timeout: float = 0,
+    ) -> None:
+        self.device = device
+        # Entities restore their last known state, if enabled
+        self.restore_state = restore_state
+        self.commands = DeebotCommandQueue(device)
+        self.events = DeebotEventRouter(device, self.commands)
+        self.device_map = DeviceMap(
+            device, self.events, watchdog_timeout=map_watchdog_timeout
+        )
+
+    async def teardown(self) -> None:
+        """Tear down the bot."""
+        self.device_map.teardown()
+        self.events.teardown()
+        self.commands.teardown()
+        await self.device.teardown()
@@ -3,7 +3,6 @@ from collections.abc import Sequence
 from dataclasses import dataclass
 
 from deebot_client.capabilities import CapabilityExecute
-from deebot_client.device import Device
 from deebot_client.events import LifeSpan
 from homeassistant.components.button import ButtonEntity, ButtonEntityDescription
 from homeassistant.config_entries import ConfigEntry
@@ -11,6 +10,7 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .bot import DeebotBot
 from .const import DOMAIN
 from .controller import DeebotController
 from .entity import DeebotEntity, DeebotEntityDescription
@@ -48,11 +48,11 @@ async def async_setup_entry(
     )
 
     def generate_reset_life_span(
-        device: Device,
+        bot: DeebotBot,
     ) -> Sequence[DeebotResetLifeSpanButtonEntity]:
         return [
-            DeebotResetLifeSpanButtonEntity(device, component)
-            for component in device.capabilities.life_span.types
+            DeebotResetLifeSpanButtonEntity(bot, component)
+            for component in bot.device.capabilities.life_span.types
         ]
 
     controller.register_platform_add_entities_generator(
@@ -66,7 +66,7 @@ class DeebotResetLifeSpanButtonEntity(
 ):
     """Deebot reset life span button entity."""
 
-    def __init__(self, device: Device, component: LifeSpan):
+    def __init__(self, bot: DeebotBot, component: LifeSpan):
         key = f"life_span_{component.name.lower()}_reset"
         entity_description = ButtonEntityDescription(
             key=key,
@@ -75,12 +75,12 @@ class DeebotResetLifeSpanButtonEntity(
             entity_registry_enabled_default=True,  # Can be enabled as they don't poll data
             entity_category=EntityCategory.CONFIG,
         )
-        super().__init__(device, None, entity_description)
-        self._command = device.capabilities.life_span.reset(component)
+        super().__init__(bot, None, entity_description)
+        self._command = bot.device.capabilities.life_span.reset(component)
 
     async def async_press(self) -> None:
         """Press the button."""
-        await self._device.execute_command(self._command)
+        await self._commands.async_execute(self._command)
 
 
 class DeebotButtonEntity(
@@ -91,4 +91,4 @@ class DeebotButtonEntity(
 
     async def async_press(self) -> None:
         """Press the button."""
-        await self._device.execute_command(self._capability.execute())
+        await self._commands.async_execute(self._capability.execute())
@@ -0,0 +1,121 @@
+"""Command queue module."""
+import asyncio
+import heapq
+import itertools
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+from typing import Any
+
+from deebot_client.command import Command
+from deebot_client.device import Device
+from deebot_client.util import create_task
+
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 1
+
+# Maximum number of commands per device, which are executed at the same time
+_MAX_IN_FLIGHT = 2
+
+
+@dataclass(order=True)
+class _QueuedCommand:
+    priority: int
+    sequence: int
+    command: Command = field(compare=False)
+    key: Hashable | None = field(compare=False)
+    future: "asyncio.Future[None]" = field(compare=False)
+
+
+class DeebotCommandQueue:
+    """Outbound commands of a device.
+
+    Commands are executed by priority and in order. Waiting commands with the same
+    key are merged, so only the latest one is sent. A command is not started while
+    a command with the same key is running, so the latest one is always sent last.
+    """
+
+    def __init__(self, device: Device) -> None:
+        self._device = device
+        self._queue: list[_QueuedCommand] = []
+        self._waiting: dict[Hashable, _QueuedCommand] = {}
+        self._running: set[Hashable] = set()
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._tasks: set[asyncio.Future[Any]] = set()
+
+    async def async_execute(
+        self,
+        command: Command,
+        *,
+        key: Hashable | None = None,
+        priority: int = PRIORITY_USER,
+    ) -> None:
+        """Execute the command.
+
+        Return, when the command or a later command with the same key was executed.
+        """
+        if key is not None and (queued := self._waiting.get(key)) is not None:
+            queued.command = command
+            if priority < queued.priority:
+                queued.priority = priority
+                heapq.heapify(self._queue)
+        else:
+            queued = _QueuedCommand(
+                priority,
+                next(self._sequence),
+                command,
+                key,
+                asyncio.get_running_loop().create_future(),
+            )
+            heapq.heappush(self._queue, queued)
+            if key is not None:
+                self._waiting[key] = queued
+            self._start_next()
+
+        await asyncio.shield(queued.future)
+
+    def teardown(self) -> None:
+        """Cancel the waiting and the running commands."""
+        for queued in self._queue:
+            queued.future.cancel()
+        self._queue.clear()
+        self._waiting.clear()
+        for task in self._tasks:
+            task.cancel()
+
+    def _start_next(self) -> None:
+        """Start the next commands, as long as the in-flight limit allows it."""
+        blocked: list[_QueuedCommand] = []
+        while self._queue and self._in_flight < _MAX_IN_FLIGHT:
+            queued = heapq.heappop(self._queue)
+            if queued.key is not None:
+                if queued.key in self._running:
+                    # Stays mergeable and is started after the running one
+                    blocked.append(queued)
+                    continue
+                self._waiting.pop(queued.key, None)
+                self._running.add(queued.key)
+            self._in_flight += 1
+            create_task(self._tasks, self._async_run(queued))
+
+        for queued in blocked:
+            heapq.heappush(self._queue, queued)
+
+    async def _async_run(self, queued: _QueuedCommand) -> None:
+        """Execute the queued command and pass the result to the waiting callers."""
+        try:
+            await self._device.execute_command(queued.command)
+        except asyncio.CancelledError:
+            queued.future.cancel()
+            raise
+        except Exception as ex:  # pylint: disable=broad-except
+            queued.future.set_exception(ex)
+            # Avoid warnings, if nobody is waiting anymore
+            queued.future.exception()
+        else:
+            queued.future.set_result(None)
+        finally:
+            self._in_flight -= 1
+            if queued.key is not None:
+                self._running.discard(queued.key)
+            self._start_next()
@@ -1,45 +1,55 @@
 """Config flow for Deebot integration."""
 import logging
-import random
-import string
+from collections.abc import Mapping
 from types import MappingProxyType
 from typing import Any
 
 import voluptuous as vol
 from aiohttp import ClientError
-from deebot_client.api_client import ApiClient
-from deebot_client.authentication import Authenticator
 from deebot_client.exceptions import InvalidAuthenticationError
-from deebot_client.models import Configuration, DeviceInfo
-from deebot_client.util import md5
+from deebot_client.models import DeviceInfo
 from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
-from homeassistant.const import (
-    CONF_DEVICES,
-    CONF_MODE,
-    CONF_PASSWORD,
-    CONF_USERNAME,
-    CONF_VERIFY_SSL,
-)
+from homeassistant.const import CONF_DEVICES, CONF_MODE, CONF_PASSWORD, CONF_USERNAME
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
-from homeassistant.helpers import aiohttp_client, selector
+from homeassistant.helpers import selector
 
 from . import get_bumper_device_id
+from .connection import DeebotConnection, async_get_connection_manager
 from .const import (
     BUMPER_CONFIGURATION,
     CONF_CLIENT_DEVICE_ID,
     CONF_CONTINENT,
     CONF_COUNTRY,
+    CONF_INIT_CONCURRENCY,
+    CONF_INIT_TIMEOUT,
+    CONF_MAP_IDLE_TIMEOUT,
+    CONF_MAP_UPDATE_INTERVAL,
+    CONF_MAP_UPDATE_INTERVAL_CLEANING,
+    CONF_MAP_WATCHDOG_TIMEOUT,
     CONF_MODE_BUMPER,
     CONF_MODE_CLOUD,
+    CONF_RESTORE_STATE,
+    DEFAULT_INIT_CONCURRENCY,
+    DEFAULT_INIT_TIMEOUT,
+    DEFAULT_MAP_IDLE_TIMEOUT,
+    DEFAULT_MAP_UPDATE_INTERVAL,
+    DEFAULT_MAP_UPDATE_INTERVAL_CLEANING,
+    DEFAULT_MAP_WATCHDOG_TIMEOUT,
+    DEFAULT_RESTORE_STATE,
     DOMAIN,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
-# Generate a random device ID on each bootup
-DEEBOT_API_DEVICEID = "".join(
-    random.choice(string.ascii_uppercase + string.digits) for _ in range(8)
+# Advanced options with their default and the allowed range
+_ADVANCED_OPTIONS: tuple[tuple[str, int, int, int], ...] = (
+    (CONF_INIT_CONCURRENCY, DEFAULT_INIT_CONCURRENCY, 1, 32),
+    (CONF_INIT_TIMEOUT, DEFAULT_INIT_TIMEOUT, 5, 300),
+    (CONF_MAP_WATCHDOG_TIMEOUT, DEFAULT_MAP_WATCHDOG_TIMEOUT, 0, 3600),
+    (CONF_MAP_UPDATE_INTERVAL, DEFAULT_MAP_UPDATE_INTERVAL, 1, 3600),
+    (CONF_MAP_UPDATE_INTERVAL_CLEANING, DEFAULT_MAP_UPDATE_INTERVAL_CLEANING, 1, 3600),
+    (CONF_MAP_IDLE_TIMEOUT, DEFAULT_MAP_IDLE_TIMEOUT, 10, 86400),
 )
 
 
@@ -212,9 +222,14 @@ class DeebotConfigFlow(ConfigFlow, domain=DOMAIN):  # type: ignore
 
 
 def _get_options_schema(
-    devices: list[DeviceInfo], defaults: dict[str, Any] | MappingProxyType[str, Any]
+    devices: list[DeviceInfo],
+    defaults: dict[str, Any] | MappingProxyType[str, Any],
+    advanced: bool = False,
 ) -> vol.Schema:
-    """Return options schema."""
+    """Return options schema.
+
+    The advanced options are only included, if advanced is True.
+    """
     select_options = []
 
     for entry in devices:
@@ -226,40 +241,47 @@ def _get_options_schema(
             selector.SelectOptionDict(value=api_info["name"], label=label)
         )
 
-    return vol.Schema(
-        {
-            vol.Required(
-                CONF_DEVICES, default=defaults.get(CONF_DEVICES, vol.UNDEFINED)
-            ): selector.SelectSelector(
-                selector.SelectSelectorConfig(
-                    options=select_options,
-                    multiple=True,
-                )
+    schema: dict[vol.Marker, Any] = {
+        vol.Required(
+            CONF_DEVICES, default=defaults.get(CONF_DEVICES, vol.UNDEFINED)
+        ): selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=select_options,
+                multiple=True,
+            )
+        ),
+        vol.Required(
+            CONF_RESTORE_STATE,
+            default=defaults.get(CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE),
+        ): selector.BooleanSelector(),
+    }
+
+    if advanced:
+        for key, default, minimum, maximum in _ADVANCED_OPTIONS:
+            schema[vol.Required(key, default=defaults.get(key, default))] = vol.All(
+                selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=minimum,
+                        max=maximum,
+                        mode=selector.NumberSelectorMode.BOX,
+                    )
+                ),
+                vol.Coerce(int),
             )
-        }
-    )
+
+    return vol.Schema(schema)
 
 
 async def _retrieve_devices(
-    hass: HomeAssistant, domain_config: dict[str, Any]
+    hass: HomeAssistant, domain_config: Mapping[str, Any]
 ) -> list[DeviceInfo]:
-    verify_ssl = domain_config.get(CONF_VERIFY_SSL, True)
-    deebot_config = Configuration(
-        aiohttp_client.async_get_clientsession(hass, verify_ssl=verify_ssl),
-        device_id=DEEBOT_API_DEVICEID,
-        continent=domain_config[CONF_CONTINENT],
-        country=domain_config[CONF_COUNTRY],
-        verify_ssl=verify_ssl,
-    )
-
-    authenticator = Authenticator(
-        deebot_config,
-        domain_config[CONF_USERNAME],
-        md5(domain_config[CONF_PASSWORD]),
-    )
-    api_client = ApiClient(authenticator)
-
-    return await api_client.get_devices()
+    manager = async_get_connection_manager(hass)
+    await manager.async_load()
+    connection: DeebotConnection = manager.async_acquire(domain_config)
+    try:
+        return await connection.api_client.get_devices()
+    finally:
+        await manager.async_release(connection)
 
 
 class DeebotOptionsFlowHandler(OptionsFlow):  # type: ignore[misc]
@@ -280,9 +302,10 @@ class DeebotOptionsFlowHandler(OptionsFlow):  # type: ignore[misc]
                 if len(user_input[CONF_DEVICES]) < 1:
                     errors[CONF_DEVICES] = "select_robots"
                 else:
+                    # Keep the options, which are not part of the form
                     return self.async_create_entry(
                         title=self._config_entry.title,
-                        data=user_input,
+                        data={**self._config_entry.options, **user_input},
                     )
             except Exception:  # pylint: disable=broad-except
                 _LOGGER.error("Unexpected exception", exc_info=True)
@@ -310,6 +333,8 @@ class DeebotOptionsFlowHandler(OptionsFlow):  # type: ignore[misc]
 
         return self.async_show_form(
             step_id="init",
-            data_schema=_get_options_schema(self._devices, user_input),
+            data_schema=_get_options_schema(
+                self._devices, user_input, self.show_advanced_options
+            ),
             errors=errors,
         )
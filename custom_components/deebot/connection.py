@@ -0,0 +1,275 @@
+"""Connection module."""
+import logging
+import random
+import string
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from deebot_client.api_client import ApiClient
+from deebot_client.authentication import Authenticator
+from deebot_client.const import PATH_API_IOT_DEVMANAGER
+from deebot_client.models import Configuration, Credentials
+from deebot_client.mqtt_client import MqttClient, MqttConfiguration
+from deebot_client.util import md5
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME, CONF_VERIFY_SSL
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import aiohttp_client
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    CONF_CLIENT_DEVICE_ID,
+    CONF_CONTINENT,
+    CONF_COUNTRY,
+    DATA_CONNECTIONS,
+    DOMAIN,
+    STORAGE_KEY_CREDENTIALS,
+    STORAGE_VERSION_CREDENTIALS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_ConnectionKey = tuple[str, str, str, str, bool | str, str | None]
+_CREDENTIALS_SAVE_DELAY = 1  # seconds
+# Error number of the ecovacs cloud for an invalid token ("auth error")
+_INVALID_TOKEN_ERRNOS = {3, "3"}
+
+
+def _is_token_rejected(response: Mapping[str, Any]) -> bool:
+    """Return True, if the cloud rejected the token of the request."""
+    if response.get("errno") in _INVALID_TOKEN_ERRNOS:
+        return True
+    message = str(response.get("error") or response.get("msg") or "")
+    return "token" in message.lower()
+
+
+def _get_connection_key(config: Mapping[str, Any]) -> _ConnectionKey:
+    """Return the key of the connection for the given config."""
+    return (
+        config.get(CONF_USERNAME, ""),
+        md5(config.get(CONF_PASSWORD, "")),
+        config.get(CONF_COUNTRY, "it").lower(),
+        config.get(CONF_CONTINENT, "eu").lower(),
+        config.get(CONF_VERIFY_SSL, True),
+        config.get(CONF_CLIENT_DEVICE_ID),
+    )
+
+
+def _get_stored_id(key: _ConnectionKey) -> str:
+    """Return the id of the stored credentials for the given connection key."""
+    return md5(repr(key))
+
+
+class _CachedAuthenticator(Authenticator):
+    """Authenticator, which starts with previously stored credentials.
+
+    The stored credentials are used until they expire or are rejected by the cloud.
+    Only public methods of the authenticator are overridden.
+    """
+
+    def __init__(
+        self,
+        config: Configuration,
+        account_id: str,
+        password_hash: str,
+        credentials: Credentials | None,
+        on_rejected: Callable[[], None],
+    ) -> None:
+        super().__init__(config, account_id, password_hash)
+        self._stored_credentials = credentials
+        self._on_rejected = on_rejected
+
+    def _get_stored_credentials(self) -> Credentials | None:
+        """Return the stored credentials, if they are still valid."""
+        if (
+            credentials := self._stored_credentials
+        ) is not None and credentials.expires_at > time.time():
+            return credentials
+        return None
+
+    async def authenticate(self, *, force: bool = False) -> Credentials:
+        """Return the stored credentials or authenticate on ecovacs servers."""
+        if not force and (credentials := self._get_stored_credentials()) is not None:
+            return credentials
+
+        self._stored_credentials = None
+        return await super().authenticate(force=force)
+
+    async def post_authenticated(
+        self,
+        path: str,
+        json: dict[str, Any],
+        *,
+        query_params: dict[str, Any] | None = None,
+        headers: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Perform an authenticated post request.
+
+        If the cloud rejects the stored token, it is dropped and a new login is
+        performed. Other requests than device commands are retried once, as
+        resending a command could execute it twice.
+        """
+        stored = self._get_stored_credentials()
+        response = await super().post_authenticated(
+            path, json, query_params=query_params, headers=headers
+        )
+        if stored is None or not _is_token_rejected(response):
+            return response
+
+        if self._stored_credentials is stored:
+            _LOGGER.debug("Stored credentials were rejected. Performing login")
+            self._stored_credentials = None
+            self._on_rejected()
+            await self.authenticate(force=True)
+
+        if path == PATH_API_IOT_DEVMANAGER:
+            return response
+
+        return await super().post_authenticated(
+            path, json, query_params=query_params, headers=headers
+        )
+
+
+@dataclass
+class DeebotConnection:
+    """Connection to the ecovacs cloud, which can be shared between entries."""
+
+    key: _ConnectionKey
+    authenticator: Authenticator
+    api_client: ApiClient
+    mqtt: MqttClient
+    ref_count: int = 0
+
+
+class DeebotConnectionManager:
+    """Reference counted connections per account and region."""
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._connections: dict[_ConnectionKey, DeebotConnection] = {}
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION_CREDENTIALS, STORAGE_KEY_CREDENTIALS, private=True
+        )
+        self._stored_credentials: dict[str, dict[str, Any]] | None = None
+
+    async def async_load(self) -> None:
+        """Load the stored credentials."""
+        if self._stored_credentials is None:
+            self._stored_credentials = await self._store.async_load() or {}
+
+    @callback  # type: ignore[misc]
+    def async_acquire(self, config: Mapping[str, Any]) -> DeebotConnection:
+        """Return the connection for the given config and increase its usage."""
+        key = _get_connection_key(config)
+        password_hash = key[1]
+        verify_ssl = config.get(CONF_VERIFY_SSL, True)
+
+        if (connection := self._connections.get(key)) is None:
+            # The credentials are only valid together with the device ID used on login
+            stored_id = _get_stored_id(key)
+            credentials: Credentials | None = None
+            device_id = config.get(CONF_CLIENT_DEVICE_ID)
+            if stored := (self._stored_credentials or {}).get(stored_id):
+                credentials = Credentials(
+                    stored["token"], stored["user_id"], stored["expires_at"]
+                )
+                device_id = stored["device_id"]
+            elif not device_id:
+                # Generate a random device ID on each bootup
+                device_id = "".join(
+                    random.choice(string.ascii_uppercase + string.digits)
+                    for _ in range(12)
+                )
+
+            deebot_config = Configuration(
+                aiohttp_client.async_get_clientsession(
+                    self._hass, verify_ssl=verify_ssl
+                ),
+                device_id=device_id,
+                country=key[2],
+                continent=key[3],
+                verify_ssl=verify_ssl,
+            )
+
+            authenticator = _CachedAuthenticator(
+                deebot_config,
+                key[0],
+                password_hash,
+                credentials,
+                lambda: self._async_remove_credentials(stored_id),
+            )
+
+            async def on_credentials_changed(credentials: Credentials) -> None:
+                self._async_save_credentials(stored_id, device_id, credentials)
+
+            authenticator.subscribe(on_credentials_changed)
+            connection = DeebotConnection(
+                key,
+                authenticator,
+                ApiClient(authenticator),
+                MqttClient(MqttConfiguration(config=deebot_config), authenticator),
+            )
+            self._connections[key] = connection
+            _LOGGER.debug("New connection created")
+
+        connection.ref_count += 1
+        return connection
+
+    @callback  # type: ignore[misc]
+    def _async_save_credentials(
+        self, stored_id: str, device_id: str, credentials: Credentials
+    ) -> None:
+        """Schedule saving the given credentials."""
+        if self._stored_credentials is None:
+            self._stored_credentials = {}
+        self._stored_credentials[stored_id] = {
+            "device_id": device_id,
+            "token": credentials.token,
+            "user_id": credentials.user_id,
+            "expires_at": credentials.expires_at,
+        }
+        self._store.async_delay_save(
+            lambda: self._stored_credentials or {}, _CREDENTIALS_SAVE_DELAY
+        )
+
+    @callback  # type: ignore[misc]
+    def _async_remove_credentials(self, stored_id: str) -> None:
+        """Schedule removing the stored credentials."""
+        if self._stored_credentials and self._stored_credentials.pop(stored_id, None):
+            self._store.async_delay_save(
+                lambda: self._stored_credentials or {}, _CREDENTIALS_SAVE_DELAY
+            )
+
+    async def async_remove_entry(self, entry: ConfigEntry) -> None:
+        """Remove the stored credentials, if no other entry uses the same account."""
+        key = _get_connection_key({**entry.data, **entry.options})
+        for other in self._hass.config_entries.async_entries(DOMAIN):
+            if other.entry_id != entry.entry_id and key == _get_connection_key(
+                {**other.data, **other.options}
+            ):
+                return
+
+        await self.async_load()
+        self._async_remove_credentials(_get_stored_id(key))
+
+    async def async_release(self, connection: DeebotConnection) -> None:
+        """Decrease the usage of the connection and close it if unused."""
+        connection.ref_count -= 1
+        if connection.ref_count > 0:
+            return
+
+        self._connections.pop(connection.key, None)
+        await connection.mqtt.disconnect()
+        await connection.authenticator.teardown()
+        _LOGGER.debug("Connection closed")
+
+
+@callback  # type: ignore[misc]
+def async_get_connection_manager(hass: HomeAssistant) -> DeebotConnectionManager:
+    """Return the connection manager stored in hass.data."""
+    domain_data: dict[str, Any] = hass.data.setdefault(DOMAIN, {})
+    if (manager := domain_data.get(DATA_CONNECTIONS)) is None:
+        manager = domain_data[DATA_CONNECTIONS] = DeebotConnectionManager(hass)
+    return manager
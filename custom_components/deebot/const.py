@@ -41,6 +41,27 @@ CONF_BUMPER = "Bumper"
 CONF_MODE_BUMPER = CONF_BUMPER
 CONF_MODE_CLOUD = "Cloud (recommended)"
 CONF_CLIENT_DEVICE_ID = "client_device_id"
+CONF_INIT_CONCURRENCY = "init_concurrency"
+CONF_INIT_TIMEOUT = "init_timeout"
+CONF_MAP_WATCHDOG_TIMEOUT = "map_watchdog_timeout"
+CONF_MAP_UPDATE_INTERVAL = "map_update_interval"
+CONF_MAP_UPDATE_INTERVAL_CLEANING = "map_update_interval_cleaning"
+CONF_MAP_IDLE_TIMEOUT = "map_idle_timeout"
+CONF_RESTORE_STATE = "restore_state"
+
+DEFAULT_INIT_CONCURRENCY = 4
+DEFAULT_INIT_TIMEOUT = 30  # seconds
+INIT_RETRY_INTERVAL = 30  # seconds
+INIT_RETRY_MAX_INTERVAL = 600  # seconds
+DEFAULT_MAP_WATCHDOG_TIMEOUT = 120  # seconds
+DEFAULT_MAP_UPDATE_INTERVAL = 30  # seconds
+DEFAULT_MAP_UPDATE_INTERVAL_CLEANING = 5  # seconds
+DEFAULT_MAP_IDLE_TIMEOUT = 300  # seconds
+DEFAULT_RESTORE_STATE = False
+# Refreshes are skipped, if the data was received within this window
+REFRESH_MAX_AGE = 5  # seconds
+# Maximum number of bots, to which a command is sent at the same time
+COMMAND_DISPATCH_CONCURRENCY = 10
 
 # Bumper has no auth and serves the urls for all countries/continents
 BUMPER_CONFIGURATION = {
@@ -52,6 +73,12 @@ BUMPER_CONFIGURATION = {
 }
 
 DEEBOT_DEVICES = f"{DOMAIN}_devices"
+DATA_CONNECTIONS = "connections"
+
+STORAGE_KEY_SNAPSHOT = DOMAIN + ".{}.snapshot"
+STORAGE_VERSION_SNAPSHOT = 1
+STORAGE_KEY_CREDENTIALS = f"{DOMAIN}.credentials"
+STORAGE_VERSION_CREDENTIALS = 1
 
 
 REFRESH_STR_TO_EVENT_DTO: Mapping[str, type[Event]] = {
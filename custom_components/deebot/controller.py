@@ -1,103 +1,341 @@
 """Controller module."""
+import asyncio
 import logging
-import random
-import string
-from collections.abc import Callable, Mapping, Sequence
+import time
+from collections.abc import Callable, Collection, Coroutine, Mapping, Sequence
 from typing import Any
 
 from deebot_client.api_client import ApiClient
 from deebot_client.authentication import Authenticator
 from deebot_client.device import Device
 from deebot_client.exceptions import InvalidAuthenticationError
-from deebot_client.models import ApiDeviceInfo, Configuration
-from deebot_client.mqtt_client import MqttClient, MqttConfiguration
-from deebot_client.util import md5
-from homeassistant.const import (
-    CONF_DEVICES,
-    CONF_PASSWORD,
-    CONF_USERNAME,
-    CONF_VERIFY_SSL,
-)
+from deebot_client.hardware.deebot import get_static_device_info
+from deebot_client.models import ApiDeviceInfo, DeviceInfo
+from deebot_client.mqtt_client import MqttClient
+from homeassistant.const import CONF_DEVICES
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
-from homeassistant.helpers import aiohttp_client
+from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceEntry
 from homeassistant.helpers.entity import EntityDescription
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.storage import Store
 
 from custom_components.deebot.entity import DeebotEntity, DeebotEntityDescription
 
-from .const import CONF_CLIENT_DEVICE_ID, CONF_CONTINENT, CONF_COUNTRY
+from .bot import DeebotBot
+from .connection import DeebotConnection, async_get_connection_manager
+from .const import (
+    CONF_INIT_CONCURRENCY,
+    CONF_INIT_TIMEOUT,
+    CONF_MAP_WATCHDOG_TIMEOUT,
+    CONF_RESTORE_STATE,
+    DEFAULT_INIT_CONCURRENCY,
+    DEFAULT_INIT_TIMEOUT,
+    DEFAULT_MAP_WATCHDOG_TIMEOUT,
+    DEFAULT_RESTORE_STATE,
+    DOMAIN,
+    INIT_RETRY_INTERVAL,
+    INIT_RETRY_MAX_INTERVAL,
+    STORAGE_KEY_SNAPSHOT,
+    STORAGE_VERSION_SNAPSHOT,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 _EntityGeneratorType = Callable[
-    [Device], Sequence[DeebotEntity[Any, EntityDescription]]
+    [DeebotBot], Sequence[DeebotEntity[Any, EntityDescription]]
 ]
 
+# Fields of the device info, which identify a bot. Other fields like the online
+# status change often and do not require to recreate the bot
+_IDENTITY_FIELDS = ("did", "name", "class", "resource")
+
+
+def _get_identity(device: DeviceInfo) -> tuple[Any, ...]:
+    """Return the fields of the device info, which identify the bot."""
+    return tuple(device.api_device_info.get(field) for field in _IDENTITY_FIELDS)
+
 
 class DeebotController:
     """Deebot Controller."""
 
-    def __init__(self, hass: HomeAssistant, config: Mapping[str, Any]):
+    def __init__(self, hass: HomeAssistant, config: Mapping[str, Any], entry_id: str):
         self._hass_config: Mapping[str, Any] = config
         self._hass: HomeAssistant = hass
-        self._devices: list[Device] = []
-        verify_ssl = config.get(CONF_VERIFY_SSL, True)
-        device_id = config.get(CONF_CLIENT_DEVICE_ID)
-
-        if not device_id:
-            # Generate a random device ID on each bootup
-            device_id = "".join(
-                random.choice(string.ascii_uppercase + string.digits) for _ in range(12)
-            )
-
-        deebot_config = Configuration(
-            aiohttp_client.async_get_clientsession(self._hass, verify_ssl=verify_ssl),
-            device_id=device_id,
-            country=config.get(CONF_COUNTRY, "it").lower(),
-            continent=config.get(CONF_CONTINENT, "eu").lower(),
-            verify_ssl=config.get(CONF_VERIFY_SSL, True),
+        self._entry_id = entry_id
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION_SNAPSHOT, STORAGE_KEY_SNAPSHOT.format(entry_id)
         )
-
-        self._authenticator = Authenticator(
-            deebot_config,
-            config.get(CONF_USERNAME, ""),
-            md5(config.get(CONF_PASSWORD, "")),
+        self._bots: list[DeebotBot] = []
+        self._setup_durations: dict[str, float] = {}
+        self._tasks: set[asyncio.Task[Any]] = set()
+        # Background initialization of a bot by its did
+        self._initialize_tasks: dict[str, asyncio.Task[Any]] = {}
+        self._add_entities_callbacks: list[Callable[[Sequence[DeebotBot]], None]] = []
+        self._entities: dict[str, list[DeebotEntity[Any, EntityDescription]]] = {}
+        self._init_concurrency: int = config.get(
+            CONF_INIT_CONCURRENCY, DEFAULT_INIT_CONCURRENCY
         )
-        self._api_client = ApiClient(self._authenticator)
+        self._init_timeout: float = config.get(CONF_INIT_TIMEOUT, DEFAULT_INIT_TIMEOUT)
+        connection: DeebotConnection = async_get_connection_manager(hass).async_acquire(
+            config
+        )
+        self._connection: DeebotConnection | None = connection
+        self._authenticator: Authenticator = connection.authenticator
+        self._api_client: ApiClient = connection.api_client
+        self._mqtt: MqttClient = connection.mqtt
 
-        mqtt_config = MqttConfiguration(config=deebot_config)
-        self._mqtt: MqttClient = MqttClient(mqtt_config, self._authenticator)
+    @property
+    def config(self) -> Mapping[str, Any]:
+        """Return the config of the entry."""
+        return self._hass_config
 
     async def initialize(self) -> None:
         """Init controller."""
         try:
-            await self.teardown()
+            if (devices := await self._async_load_snapshot()) is not None:
+                # Create the bots from the snapshot and talk to the cloud later
+                self._create_bots(devices, self._hass_config.get(CONF_DEVICES, []))
+                self._create_background_task(self._async_start_from_snapshot(), "start")
+            else:
+                devices = await self._api_client.get_devices()
+                await self._async_save_snapshot(devices)
 
-            devices = await self._api_client.get_devices()
+                await self._mqtt.connect()
 
-            await self._mqtt.connect()
-
-            for device in devices:
-                if device.api_device_info["name"] in self._hass_config.get(
-                    CONF_DEVICES, []
-                ):
-                    bot = Device(device, self._authenticator)
-                    _LOGGER.debug(
-                        "New vacbot found: %s", device.api_device_info["name"]
-                    )
-                    await bot.initialize(self._mqtt)
-                    self._devices.append(bot)
+                bots = self._create_bots(
+                    devices, self._hass_config.get(CONF_DEVICES, [])
+                )
+                await self._async_initialize_devices(bots)
 
             _LOGGER.debug("Controller initialize complete")
         except InvalidAuthenticationError as ex:
+            await self.teardown()
             raise ConfigEntryAuthFailed from ex
         except Exception as ex:
             msg = "Error during setup"
             _LOGGER.error(msg, exc_info=True)
+            await self.teardown()
             raise ConfigEntryNotReady(msg) from ex
 
+    def _create_bots(
+        self, devices: list[DeviceInfo], names: Collection[str]
+    ) -> list[DeebotBot]:
+        """Create a bot for each device with one of the given names."""
+        bots: list[DeebotBot] = []
+        for device in devices:
+            if device.api_device_info["name"] in names:
+                bot = DeebotBot(
+                    Device(device, self._authenticator),
+                    restore_state=self._hass_config.get(
+                        CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE
+                    ),
+                    map_watchdog_timeout=self._hass_config.get(
+                        CONF_MAP_WATCHDOG_TIMEOUT, DEFAULT_MAP_WATCHDOG_TIMEOUT
+                    ),
+                )
+                _LOGGER.debug("New vacbot found: %s", device.api_device_info["name"])
+                bots.append(bot)
+
+        self._bots.extend(bots)
+        return bots
+
+    async def async_update_config(self, config: Mapping[str, Any]) -> bool:
+        """Apply the changed config without reloading.
+
+        Only changes of the selected devices can be applied. Return False, if the
+        config entry needs to be reloaded.
+        """
+        if {k: v for k, v in config.items() if k != CONF_DEVICES} != {
+            k: v for k, v in self._hass_config.items() if k != CONF_DEVICES
+        }:
+            return False
+
+        old_names = set(self._hass_config.get(CONF_DEVICES, []))
+        new_names = set(config.get(CONF_DEVICES, []))
+        self._hass_config = config
+
+        if removed := old_names - new_names:
+            await self._async_remove_bots(removed)
+
+        if added := new_names - old_names:
+            devices = await self._async_load_snapshot()
+            if devices is None or not added.issubset(
+                device.api_device_info["name"] for device in devices
+            ):
+                try:
+                    devices = await self._api_client.get_devices()
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.debug("Could not retrieve devices", exc_info=True)
+                    return False
+                await self._async_save_snapshot(devices)
+
+            bots = self._create_bots(devices, added)
+            await self._async_initialize_devices(bots)
+            for add_entities in self._add_entities_callbacks:
+                add_entities(bots)
+
+        return True
+
+    async def _async_remove_bots(self, names: Collection[str]) -> None:
+        """Tear down the bots with the given names and remove their devices."""
+        device_registry = dr.async_get(self._hass)
+        for bot in [bot for bot in self._bots if bot.device.device_info.name in names]:
+            device_info = bot.device.device_info
+            _LOGGER.debug("Removing vacbot: %s", device_info.name)
+            self._bots.remove(bot)
+            self._setup_durations.pop(device_info.did, None)
+            if task := self._initialize_tasks.pop(device_info.did, None):
+                task.cancel()
+            # Remove the entities first, so they release their listeners on the bot
+            for entity in self._entities.pop(device_info.did, []):
+                if entity.platform is not None:
+                    await entity.async_remove(force_remove=True)
+            await bot.teardown()
+
+            if device := device_registry.async_get_device(
+                identifiers={(DOMAIN, device_info.did)}
+            ):
+                # Removes the entities of the device as well
+                device_registry.async_update_device(
+                    device.id, remove_config_entry_id=self._entry_id
+                )
+
+    async def _async_load_snapshot(self) -> list[DeviceInfo] | None:
+        """Load the device list of the last successful cloud request."""
+        if (data := await self._store.async_load()) is None:
+            return None
+
+        _LOGGER.debug("Using device snapshot from storage")
+        return [
+            DeviceInfo(info, get_static_device_info(info["class"]))
+            for info in data["devices"]
+        ]
+
+    async def _async_save_snapshot(self, devices: list[DeviceInfo]) -> None:
+        """Save the device list to the storage."""
+        await self._store.async_save(
+            {"devices": [device.api_device_info for device in devices]}
+        )
+
+    async def _async_start_from_snapshot(self) -> None:
+        """Initialize the bots and reconcile the snapshot with the cloud."""
+        try:
+            await self._async_initialize_devices(self._bots.copy())
+        except InvalidAuthenticationError:
+            self._async_start_reauth()
+            return
+
+        delay = INIT_RETRY_INTERVAL
+        while True:
+            try:
+                devices = await self._api_client.get_devices()
+                break
+            except InvalidAuthenticationError:
+                self._async_start_reauth()
+                return
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.debug(
+                    "Could not retrieve devices. Retrying in %d seconds",
+                    delay,
+                    exc_info=True,
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, INIT_RETRY_MAX_INTERVAL)
+
+        await self._async_save_snapshot(devices)
+
+        selected = self._hass_config.get(CONF_DEVICES, [])
+        current = {_get_identity(bot.device.device_info) for bot in self._bots}
+        new = {
+            _get_identity(device)
+            for device in devices
+            if device.api_device_info["name"] in selected
+        }
+        if current != new:
+            _LOGGER.info("Device list changed in the cloud. Reloading entry")
+            self._hass.async_create_task(
+                self._hass.config_entries.async_reload(self._entry_id)
+            )
+
+    def _async_start_reauth(self) -> None:
+        """Start the reauthentication flow of the config entry."""
+        if entry := self._hass.config_entries.async_get_entry(self._entry_id):
+            entry.async_start_reauth(self._hass)
+
+    async def _async_initialize_devices(self, bots: list[DeebotBot]) -> None:
+        """Initialize the given bots concurrently."""
+        semaphore = asyncio.Semaphore(self._init_concurrency)
+        results = await asyncio.gather(
+            *[self._initialize_device(bot.device, semaphore) for bot in bots]
+        )
+        for bot, initialized in zip(bots, results):
+            if not initialized:
+                self._retry_initialize_device(bot.device, semaphore)
+
+    async def _initialize_device(
+        self, bot: Device, semaphore: asyncio.Semaphore
+    ) -> bool:
+        """Initialize a single bot and return True on success."""
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                async with asyncio.timeout(self._init_timeout):
+                    await bot.initialize(self._mqtt)
+            except InvalidAuthenticationError:
+                raise
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.warning(
+                    "Could not initialize vacbot %s. Retrying in background",
+                    bot.device_info.name,
+                    exc_info=True,
+                )
+                return False
+
+            duration = time.monotonic() - start
+            self._setup_durations[bot.device_info.did] = duration
+            _LOGGER.debug(
+                "Vacbot %s initialized in %.3fs", bot.device_info.name, duration
+            )
+            return True
+
+    def _retry_initialize_device(
+        self, bot: Device, semaphore: asyncio.Semaphore
+    ) -> None:
+        """Retry to initialize the given bot in the background until it succeeds."""
+
+        async def retry() -> None:
+            delay = INIT_RETRY_INTERVAL
+            while True:
+                await asyncio.sleep(delay)
+                try:
+                    if await self._initialize_device(bot, semaphore):
+                        return
+                except InvalidAuthenticationError:
+                    _LOGGER.error(
+                        "Authentication failed during initialization of vacbot %s",
+                        bot.device_info.name,
+                    )
+                    return
+                delay = min(delay * 2, INIT_RETRY_MAX_INTERVAL)
+
+        did = bot.device_info.did
+        task = self._create_background_task(retry(), f"initialize_{did}")
+        self._initialize_tasks[did] = task
+        task.add_done_callback(lambda _: self._initialize_tasks.pop(did, None))
+
+    def _create_background_task(
+        self, target: Coroutine[Any, Any, None], name: str
+    ) -> asyncio.Task[None]:
+        """Create a background task, which will be cancelled on teardown."""
+        task: asyncio.Task[None] = self._hass.async_create_background_task(
+            target, f"{DOMAIN}_{name}"
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
     def register_platform_add_entities(
         self,
         entity_class: type[DeebotEntity],
@@ -105,15 +343,24 @@ class DeebotController:
         async_add_entities: AddEntitiesCallback,
     ) -> None:
         """Create entities from descriptions and add them."""
-        new_entites: list[DeebotEntity] = []
 
-        for device in self._devices:
-            for description in descriptions:
-                if capability := description.capability_fn(device.capabilities):
-                    new_entites.append(entity_class(device, capability, description))
+        def add_entities(bots: Sequence[DeebotBot]) -> None:
+            new_entites: list[DeebotEntity] = []
+
+            for bot in bots:
+                device = bot.device
+                device_entities = self._entities.setdefault(device.device_info.did, [])
+                for description in descriptions:
+                    if capability := description.capability_fn(device.capabilities):
+                        entity = entity_class(bot, capability, description)
+                        new_entites.append(entity)
+                        device_entities.append(entity)
 
-        if new_entites:
-            async_add_entities(new_entites)
+            if new_entites:
+                async_add_entities(new_entites)
+
+        self._add_entities_callbacks.append(add_entities)
+        add_entities(self._bots)
 
     def register_platform_add_entities_generator(
         self,
@@ -121,30 +368,110 @@ class DeebotController:
         functions: _EntityGeneratorType | tuple[_EntityGeneratorType, ...],
     ) -> None:
         """Add entities generated through the provided function."""
-        new_entites: list[DeebotEntity[Any, EntityDescription]] = []
+        if callable(functions):
+            functions = (functions,)
+
+        def add_entities(bots: Sequence[DeebotBot]) -> None:
+            new_entites: list[DeebotEntity[Any, EntityDescription]] = []
 
-        for device in self._devices:
-            if callable(functions):
-                functions = (functions,)
-            for func in functions:
-                new_entites.extend(func(device))
+            for bot in bots:
+                device_entities = self._entities.setdefault(
+                    bot.device.device_info.did, []
+                )
+                for func in functions:
+                    entities = func(bot)
+                    new_entites.extend(entities)
+                    device_entities.extend(entities)
 
-        if new_entites:
-            async_add_entities(new_entites)
+            if new_entites:
+                async_add_entities(new_entites)
+
+        self._add_entities_callbacks.append(add_entities)
+        add_entities(self._bots)
+
+    def add_bot_entities(
+        self,
+        bot: DeebotBot,
+        entities: Sequence[DeebotEntity[Any, EntityDescription]],
+        async_add_entities: AddEntitiesCallback,
+    ) -> None:
+        """Add entities of the bot, which are created after the platform setup.
+
+        The entities are tracked like all others, so they are removed with the bot.
+        """
+        if bot not in self._bots:
+            return
+
+        self._entities.setdefault(bot.device.device_info.did, []).extend(entities)
+        async_add_entities(entities)
+
+    def get_entity(self, entity_id: str) -> DeebotEntity[Any, EntityDescription] | None:
+        """Get the entity with the given entity id."""
+        for entities in self._entities.values():
+            for entity in entities:
+                if entity.entity_id == entity_id:
+                    return entity
+
+        return None
+
+    def get_bot(self, device: DeviceEntry) -> DeebotBot | None:
+        """Get the bot for the given entry."""
+        for bot in self._bots:
+            for identifier in device.identifiers:
+                if bot.device.device_info.did == identifier[1]:
+                    return bot
+
+        return None
 
     def get_device_info(self, device: DeviceEntry) -> ApiDeviceInfo | dict[str, str]:
         """Get the device info for the given entry."""
-        for bot in self._devices:
-            for identifier in device.identifiers:
-                if bot.device_info.did == identifier[1]:
-                    return bot.device_info.api_device_info
+        if bot := self.get_bot(device):
+            return bot.device.device_info.api_device_info
 
         _LOGGER.error("Could not find the device with entry: %s", device.json_repr)
         return {"error": "Could not find the device"}
 
+    def get_setup_info(self, device: DeviceEntry) -> dict[str, Any]:
+        """Get the setup information for the given entry."""
+        if (bot := self.get_bot(device)) is None:
+            return {"error": "Could not find the device"}
+
+        duration = self._setup_durations.get(bot.device.device_info.did)
+        return {
+            "initialized": duration is not None,
+            "duration": duration,
+        }
+
+    def get_map_geometry(self, device: DeviceEntry) -> dict[str, Any] | None:
+        """Get the map geometry for the given entry."""
+        if (bot := self.get_bot(device)) is None or not bot.device.capabilities.map:
+            return None
+
+        return bot.device_map.get_geometry()
+
+    def get_state_write_stats(self, device: DeviceEntry) -> dict[str, Any]:
+        """Get the state write statistics for the given entry."""
+        if (bot := self.get_bot(device)) is None:
+            return {"error": "Could not find the device"}
+
+        entities = self._entities.get(bot.device.device_info.did, [])
+        return {
+            "written": sum(entity.state_writes for entity in entities),
+            "saved": sum(entity.state_writes_saved for entity in entities),
+            "unchanged": sum(entity.state_writes_unchanged for entity in entities),
+        }
+
     async def teardown(self) -> None:
         """Disconnect controller."""
-        for bot in self._devices:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        for bot in self._bots:
             await bot.teardown()
-        await self._mqtt.disconnect()
-        await self._authenticator.teardown()
+        self._bots.clear()
+        self._entities.clear()
+        if self._connection is not None:
+            await async_get_connection_manager(self._hass).async_release(
+                self._connection
+            )
+            self._connection = None
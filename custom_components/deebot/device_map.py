@@ -0,0 +1,474 @@
+"""Device map module."""
+import asyncio
+import base64
+import copy
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from typing import Any
+
+from deebot_client.device import Device
+from deebot_client.events import RoomsEvent, StateEvent
+from deebot_client.events.map import (
+    CachedMapInfoEvent,
+    MajorMapEvent,
+    MapChangedEvent,
+    MapTraceEvent,
+    MinorMapEvent,
+    PositionsEvent,
+    PositionType,
+)
+from deebot_client.map import Map
+from deebot_client.models import Room, State
+from deebot_client.util import OnChangedDict, OnChangedList
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+from PIL import Image
+
+from .event_router import DeebotEventRouter
+from .geometry import build_room_geometry, get_dock_position
+from .trail import PositionTrail
+
+_LOGGER = logging.getLogger(__name__)
+
+# Limit the number of maps rendered in parallel in the executor
+_RENDER_SEMAPHORE = asyncio.Semaphore(2)
+# Maximum number of positions kept per clean job
+_TRAIL_CAPACITY = 4096
+# Maximum number of maps (floors), whose last image is kept
+_STORED_MAPS = 4
+
+
+@dataclass
+class StoredMap:
+    """Last image of a map (floor) of the bot."""
+
+    map_id: str
+    name: str
+    image: bytes
+    updated: datetime
+
+
+class DeviceMap:
+    """Map images and position trail of a device, shared by its image entities."""
+
+    def __init__(
+        self,
+        device: Device,
+        events: DeebotEventRouter,
+        *,
+        watchdog_timeout: float = 0,
+    ) -> None:
+        self._device = device
+        self._events = events
+        self._enabled_count = 0
+        # Seconds without map change while cleaning, after which the map is refreshed
+        self._watchdog_timeout = watchdog_timeout
+        self._watchdog: asyncio.TimerHandle | None = None
+        self._cleaning = False
+        self._keep_alive_until = 0.0
+        self._cancel_keep_alive: Callable[[], None] | None = None
+        self.trail = PositionTrail(_TRAIL_CAPACITY)
+        self._trail_subscriptions: list[Callable[[], None]] = []
+        self._trail_count = 0
+        self._state: State | None = None
+        self._map_subscriptions: list[Callable[[], None]] = []
+        self._stream_callbacks: list[Callable[[dict[str, Any]], None]] = []
+        # Raw map data as received from the bot, used for the stream snapshot
+        self._map_id: str | None = None
+        self._pieces: dict[int, str] = {}
+        self._trace: dict[int, tuple[int, str]] = {}
+        self._map_name = ""
+        # True after switching the map until a piece of the new map was received
+        self._switched = False
+        self.stored_maps: OrderedDict[str, StoredMap] = OrderedDict()
+        self._switch_listeners: list[Callable[[], None]] = []
+        self._store_listeners: list[Callable[[], None]] = []
+        # Increased on each map change, so all entities share the cached images
+        self._version = 0
+        # Decoded image and the map version it was built for, per width
+        self._images: dict[int | None, tuple[int, bytes | None]] = {}
+        self._tasks: dict[tuple[int, int | None], asyncio.Task[bytes | None]] = {}
+        # Rooms and the geometry built from them
+        self._room_geometry: tuple[list[Room], dict[str, Any]] | None = None
+
+    def enable(self) -> None:
+        """Enable the map of the device."""
+        self._enabled_count += 1
+        if self._enabled_count == 1:
+            self._map_subscriptions = self._subscribe_map_data()
+            self._device.map.enable()
+
+    def disable(self) -> None:
+        """Disable the map of the device, if no entity needs it anymore."""
+        self._enabled_count -= 1
+        if self._enabled_count == 0:
+            self._device.map.disable()
+            for unsubscribe in self._map_subscriptions:
+                unsubscribe()
+            self._map_subscriptions = []
+            self._cleaning = False
+            self._reset_watchdog()
+
+    @property
+    def cleaning(self) -> bool:
+        """Return True, if the map is enabled and the bot is cleaning."""
+        return self._cleaning
+
+    def _reset_watchdog(self) -> None:
+        """Restart the watchdog, which refreshes the map while cleaning."""
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+
+        if self._enabled_count and self._cleaning and self._watchdog_timeout > 0:
+            self._watchdog = asyncio.get_running_loop().call_later(
+                self._watchdog_timeout, self._on_watchdog
+            )
+
+    def _on_watchdog(self) -> None:
+        """Refresh the map as no change was received for too long."""
+        self._watchdog = None
+        _LOGGER.debug("No map change received while cleaning. Refreshing map")
+        self._device.map.refresh()
+        self._reset_watchdog()
+
+    @callback  # type: ignore[misc]
+    def async_keep_alive(self, hass: HomeAssistant, duration: float) -> None:
+        """Enable the map for at least the given duration in seconds."""
+        until = time.monotonic() + duration
+        if until <= self._keep_alive_until:
+            return
+
+        self._keep_alive_until = until
+        if self._cancel_keep_alive is None:
+            self.enable()
+        else:
+            self._cancel_keep_alive()
+
+        @callback  # type: ignore[misc]
+        def on_timeout(_: datetime) -> None:
+            self._cancel_keep_alive = None
+            self._keep_alive_until = 0.0
+            self.disable()
+
+        self._cancel_keep_alive = async_call_later(hass, duration, on_timeout)
+
+    def teardown(self) -> None:
+        """Cancel the pending image builds and drop all map data."""
+        if self._cancel_keep_alive is not None:
+            self._cancel_keep_alive()
+            self._cancel_keep_alive = None
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._images.clear()
+        self._room_geometry = None
+        self.stored_maps.clear()
+        self._pieces.clear()
+        self._trace.clear()
+        self.trail.clear()
+
+    @property
+    def map_id(self) -> str | None:
+        """Return the id of the active map."""
+        return self._map_id
+
+    def get_geometry(self) -> dict[str, Any]:
+        """Return the room polygons, dock position and map bounds.
+
+        The room geometry is only rebuilt when the rooms change.
+        """
+        rooms_event = self._device.events.get_last_event(RoomsEvent)
+        rooms = rooms_event.rooms if rooms_event else []
+        if self._room_geometry is None or self._room_geometry[0] != rooms:
+            self._room_geometry = (rooms, build_room_geometry(rooms))
+
+        return {**self._room_geometry[1], "dock": get_dock_position(self._device)}
+
+    def add_switch_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Add a listener, which is called when the active map was switched.
+
+        Return a function to remove the listener.
+        """
+        self._switch_listeners.append(listener)
+        return lambda: self._switch_listeners.remove(listener)
+
+    def add_store_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Add a listener, which is called when a map image was stored.
+
+        Return a function to remove the listener.
+        """
+        self._store_listeners.append(listener)
+        return lambda: self._store_listeners.remove(listener)
+
+    def subscribe_stream(
+        self, callback: Callable[[dict[str, Any]], None]
+    ) -> Callable[[], None]:
+        """Subscribe to the map changes, starting with a snapshot.
+
+        The map is enabled while subscribed. Return a function to unsubscribe.
+        """
+        self.enable()
+        self._stream_callbacks.append(callback)
+        callback(self._get_snapshot())
+
+        def unsubscribe() -> None:
+            self._stream_callbacks.remove(callback)
+            self.disable()
+
+        return unsubscribe
+
+    def _get_snapshot(self) -> dict[str, Any]:
+        """Return all known map data."""
+        positions = self._device.events.get_last_event(PositionsEvent)
+        return {
+            "type": "snapshot",
+            "map_id": self._map_id,
+            "pieces": {str(index): value for index, value in self._pieces.items()},
+            "trace": [
+                {"start": start, "total": total, "data": data}
+                for start, (total, data) in sorted(self._trace.items())
+            ],
+            "positions": _positions_as_list(positions) if positions else [],
+        }
+
+    def _send(self, message: dict[str, Any]) -> None:
+        """Send the message to all stream subscribers."""
+        for stream_callback in self._stream_callbacks.copy():
+            stream_callback(message)
+
+    def _subscribe_map_data(self) -> list[Callable[[], None]]:
+        """Keep the raw map data and pass the changes to the stream subscribers."""
+        events = self._events
+
+        async def on_info(event: CachedMapInfoEvent) -> None:
+            self._map_name = event.name
+
+        async def on_major_map(event: MajorMapEvent) -> None:
+            if event.map_id != self._map_id:
+                switched = self._map_id is not None
+                self._map_id = event.map_id
+                self._pieces.clear()
+                self._send({"type": "map", "map_id": event.map_id})
+                if switched:
+                    self._switched = True
+                    if event.map_id in self.stored_maps:
+                        self.stored_maps.move_to_end(event.map_id)
+                    for listener in self._switch_listeners.copy():
+                        listener()
+
+        async def on_changed(_: MapChangedEvent) -> None:
+            self._version += 1
+            self._reset_watchdog()
+
+        async def on_state(event: StateEvent) -> None:
+            self._cleaning = event.state == State.CLEANING
+            self._reset_watchdog()
+
+        async def on_minor_map(event: MinorMapEvent) -> None:
+            # Pieces are requested after the major map, so they belong to the new map.
+            # Other changes like positions do not replace the pieces of the old map
+            self._switched = False
+            if self._pieces.get(event.index) != event.value:
+                self._pieces[event.index] = event.value
+                self._send(
+                    {"type": "piece", "index": event.index, "value": event.value}
+                )
+
+        async def on_trace(event: MapTraceEvent) -> None:
+            if event.start == 0:
+                self._trace.clear()
+            self._trace[event.start] = (event.total, event.data)
+            self._send(
+                {
+                    "type": "trace",
+                    "start": event.start,
+                    "total": event.total,
+                    "data": event.data,
+                }
+            )
+
+        async def on_positions(event: PositionsEvent) -> None:
+            if self._stream_callbacks:
+                self._send(
+                    {"type": "positions", "positions": _positions_as_list(event)}
+                )
+
+        return [
+            events.subscribe(CachedMapInfoEvent, on_info),
+            events.subscribe(MapChangedEvent, on_changed),
+            events.subscribe(MajorMapEvent, on_major_map),
+            events.subscribe(MinorMapEvent, on_minor_map),
+            events.subscribe(MapTraceEvent, on_trace),
+            events.subscribe(PositionsEvent, on_positions),
+            events.subscribe(StateEvent, on_state),
+        ]
+
+    def track_trail(self) -> Callable[[], None]:
+        """Record the positions of the bot of the current clean job.
+
+        Return a function to stop tracking.
+        """
+        self._trail_count += 1
+        if self._trail_count == 1:
+            events = self._events
+
+            async def on_positions(event: PositionsEvent) -> None:
+                for position in event.positions:
+                    if position.type == PositionType.DEEBOT:
+                        self.trail.append(position.x, position.y)
+
+            async def on_state(event: StateEvent) -> None:
+                if event.state == State.CLEANING and self._state not in (
+                    State.CLEANING,
+                    State.PAUSED,
+                ):
+                    # A new clean job has started
+                    self.trail.clear()
+                self._state = event.state
+
+            self._trail_subscriptions = [
+                events.subscribe(PositionsEvent, on_positions),
+                events.subscribe(StateEvent, on_state),
+            ]
+
+        def untrack() -> None:
+            self._trail_count -= 1
+            if self._trail_count == 0:
+                for unsubscribe in self._trail_subscriptions:
+                    unsubscribe()
+                self._trail_subscriptions = []
+
+        return untrack
+
+    async def async_get_image(
+        self, hass: HomeAssistant, width: int | None
+    ) -> bytes | None:
+        """Return the image with the given width or the full size image.
+
+        The image is only rebuilt, if the map has changed since the last build.
+        After switching the map, the stored image of the new map is returned until
+        the new map is received. Concurrent requests share the same build.
+        """
+        if (
+            width is None
+            and self._switched
+            and self._map_id is not None
+            and (stored_map := self.stored_maps.get(self._map_id)) is not None
+        ):
+            return stored_map.image
+
+        version = self._version
+        if (image := self._images.get(width)) is not None and image[0] == version:
+            return image[1]
+
+        key = (version, width)
+        if (task := self._tasks.get(key)) is None:
+            task = self._tasks[key] = hass.async_create_task(
+                self._async_build_image(hass, version, width)
+            )
+        return await asyncio.shield(task)
+
+    async def _async_build_image(
+        self, hass: HomeAssistant, version: int, width: int | None
+    ) -> bytes | None:
+        """Build the image in the executor and cache it for the given map version."""
+        try:
+            image: bytes | None
+            if width is None:
+                async with _RENDER_SEMAPHORE:
+                    # The map data is changed on the event loop while rendering
+                    snapshot = _copy_map(self._device.map)
+                    rendered: bytes = await hass.async_add_executor_job(
+                        _render, snapshot
+                    )
+                self._store_map(rendered)
+                image = rendered
+            elif (full_image := await self.async_get_image(hass, None)) is None:
+                image = None
+            else:
+                async with _RENDER_SEMAPHORE:
+                    image = await hass.async_add_executor_job(
+                        _downscale, full_image, width
+                    )
+        finally:
+            self._tasks.pop((version, width), None)
+
+        self._images[width] = (version, image)
+        return image
+
+    def _store_map(self, image: bytes) -> None:
+        """Store the image of the active map and forget the least recently used."""
+        if self._map_id is None or self._switched:
+            return
+
+        self.stored_maps[self._map_id] = StoredMap(
+            self._map_id, self._map_name, image, dt_util.utcnow()
+        )
+        self.stored_maps.move_to_end(self._map_id)
+        while len(self.stored_maps) > _STORED_MAPS:
+            self.stored_maps.popitem(last=False)
+        for listener in self._store_listeners.copy():
+            listener()
+
+
+def _positions_as_list(event: PositionsEvent) -> list[dict[str, Any]]:
+    """Return the positions of the event as list."""
+    return [
+        {"type": position.type.value, "x": position.x, "y": position.y}
+        for position in event.positions
+    ]
+
+
+def _copy_map(source: Map) -> Map:
+    """Return a copy of the map, which is not changed by new events.
+
+    The points of a map piece are replaced on an update and not changed in place,
+    so copying the pieces is enough. The copy has no cached image and is always
+    rendered.
+    """
+    # pylint: disable=protected-access
+    data = copy.copy(source._map_data)
+    data._map_pieces = OnChangedList(
+        _ignore_change, [copy.copy(piece) for piece in data.map_pieces]
+    )
+    data._map_subsets = OnChangedDict(_ignore_change, data.map_subsets.items())
+    data._positions = OnChangedList(_ignore_change, data.positions)
+    data._rooms = OnChangedDict(_ignore_change, data.rooms.items())
+    data._trace_values = OnChangedList(_ignore_change, data.trace_values)
+
+    snapshot = copy.copy(source)
+    snapshot._map_data = data  # type: ignore[misc]
+    snapshot._last_image = None
+    return snapshot
+
+
+def _ignore_change() -> None:
+    """Ignore changes of a map copy."""
+
+
+def _render(map_: Map) -> bytes:
+    """Render the full size image."""
+    return base64.decodebytes(map_.get_base64_map())
+
+
+def _downscale(image: bytes, width: int) -> bytes:
+    """Downscale the given png image to the given width."""
+    with Image.open(BytesIO(image)) as img:
+        if img.width <= width:
+            return image
+        height = max(1, round(img.height * width / img.width))
+        buffered = BytesIO()
+        img.resize((width, height), Image.Resampling.LANCZOS).save(
+            buffered, format="PNG"
+        )
+    return buffered.getvalue()
@@ -28,5 +28,8 @@ async def async_get_device_diagnostics(
     diag["device"] = async_redact_data(
         controller.get_device_info(device), REDACT_DEVICE
     )
+    diag["setup"] = controller.get_setup_info(device)
+    diag["state_writes"] = controller.get_state_write_stats(device)
+    diag["map_geometry"] = controller.get_map_geometry(device)
 
     return diag
@@ -1,15 +1,17 @@
 """Deebot entity module."""
+import asyncio
 from collections.abc import Callable
 from dataclasses import dataclass
 from typing import Any, Generic, TypeVar
 
 from deebot_client.capabilities import Capabilities
-from deebot_client.device import Device
-from deebot_client.events import AvailabilityEvent
+from deebot_client.command import Command
 from deebot_client.events.base import Event
+from homeassistant.core import callback
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.entity import DeviceInfo, Entity, EntityDescription
 
+from .bot import DeebotBot
 from .const import DOMAIN
 
 _EntityDescriptionT = TypeVar("_EntityDescriptionT", bound=EntityDescription)
@@ -35,10 +37,12 @@ class DeebotEntity(Entity, Generic[CapabilityT, _EntityDescriptionT]):  # type:
     _attr_should_poll = False
     _always_available: bool = False
     _attr_has_entity_name = True
+    # Window in seconds to coalesce state writes. 0 means the next loop iteration
+    _state_write_delay: float = 0
 
     def __init__(
         self,
-        device: Device,
+        bot: DeebotBot,
         capability: CapabilityT,
         entity_description: _EntityDescriptionT | None = None,
         **kwargs: Any,
@@ -52,8 +56,16 @@ class DeebotEntity(Entity, Generic[CapabilityT, _EntityDescriptionT]):  # type:
                 '"entity_description" must be either set as class variable or passed on init!'
             )
 
-        self._device = device
+        self._device = bot.device
         self._capability = capability
+        self._events = bot.events
+        self._restore_state = bot.restore_state
+        self._commands = bot.commands
+        self._state_write_handle: asyncio.Handle | None = None
+        self._last_written: tuple[Any, ...] | None = None
+        self.state_writes = 0
+        self.state_writes_saved = 0
+        self.state_writes_unchanged = 0
 
         self._attr_unique_id = self._device.device_info.did
 
@@ -86,12 +98,85 @@ class DeebotEntity(Entity, Generic[CapabilityT, _EntityDescriptionT]):  # type:
         """Set up the event listeners now that hass is ready."""
         await super().async_added_to_hass()
 
-        if not self._always_available:
-
-            async def on_available(event: AvailabilityEvent) -> None:
-                self._attr_available = event.available
-                self.async_write_ha_state()
+        if self._restore_state:
+            await self._async_restore_state()
 
+        if not self._always_available:
             self.async_on_remove(
-                self._device.events.subscribe(AvailabilityEvent, on_available)
+                self._events.subscribe_availability(self.async_set_available)
+            )
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel a pending state write."""
+        await super().async_will_remove_from_hass()
+        if self._state_write_handle is not None:
+            self._state_write_handle.cancel()
+            self._state_write_handle = None
+
+    async def _async_execute_set(self, command: Command) -> None:
+        """Execute the set command.
+
+        A waiting set command of the same type is replaced, so only the latest
+        value is sent.
+        """
+        await self._commands.async_execute(command, key=type(command))
+
+    @callback  # type: ignore[misc]
+    def async_set_available(self, available: bool) -> None:
+        """Set the availability and write the state directly, if it changed."""
+        if self.available == available:
+            return
+
+        self._attr_available = available
+        if self._state_write_handle is None:
+            # Otherwise the scheduled write will include the new availability
+            self._async_write_scheduled_state()
+
+    @callback  # type: ignore[misc]
+    def async_schedule_write_state(self) -> None:
+        """Schedule a state write.
+
+        All calls until the write is done are coalesced into a single write.
+        """
+        if self._state_write_handle is not None:
+            self.state_writes_saved += 1
+            return
+
+        if self._state_write_delay > 0:
+            self._state_write_handle = self.hass.loop.call_later(
+                self._state_write_delay, self._async_write_scheduled_state
+            )
+        else:
+            self._state_write_handle = self.hass.loop.call_soon(
+                self._async_write_scheduled_state
             )
+
+    @callback  # type: ignore[misc]
+    def _async_write_scheduled_state(self) -> None:
+        """Write the scheduled state, if it changed since the last write."""
+        self._state_write_handle = None
+
+        # Shallow copies are enough as attributes are replaced and not mutated deeply
+        state_attributes = self.state_attributes
+        extra_state_attributes = self.extra_state_attributes
+        written = (
+            self.available,
+            self.state,
+            self.icon,
+            dict(state_attributes) if state_attributes else None,
+            dict(extra_state_attributes) if extra_state_attributes else None,
+        )
+        if written == self._last_written:
+            self.state_writes_unchanged += 1
+            return
+
+        self._last_written = written
+        self.state_writes += 1
+        self.async_write_ha_state()
+
+    async def _async_restore_state(self) -> None:
+        """Restore the last known state until the first event arrives.
+
+        Entities, which support state restoration, must override it. It is only
+        called, if state restoration is enabled in the options.
+        """
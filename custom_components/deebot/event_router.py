@@ -0,0 +1,223 @@
+"""Event router module."""
+import asyncio
+import logging
+import time
+from collections.abc import Callable, Coroutine, Hashable
+from functools import partial
+from typing import Any, TypeVar
+
+from deebot_client.device import Device
+from deebot_client.events import AvailabilityEvent, Event, LifeSpanEvent
+from deebot_client.util import create_task
+
+from .command_queue import PRIORITY_BACKGROUND, DeebotCommandQueue
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=Event)
+_Callback = Callable[[Any], Coroutine[Any, Any, None]]
+
+# Functions to get the key of an event, which is used to dispatch it only to
+# the callbacks subscribed with the same key
+_EVENT_KEY_FNS: dict[type[Event], Callable[[Any], Hashable]] = {
+    LifeSpanEvent: lambda event: event.type,
+}
+
+# Seconds after which a requested refresh is not treated as in-flight anymore
+_REFRESH_TIMEOUT = 10
+
+
+class _Route:
+    """Subscribers of a single event type."""
+
+    def __init__(self, key_fn: Callable[[Any], Hashable] | None) -> None:
+        self.key_fn = key_fn
+        self.callbacks: list[_Callback] = []
+        self.keyed_callbacks: dict[Hashable, list[_Callback]] = {}
+        self.last_keyed_events: dict[Hashable, Event] = {}
+        # Last event, which the event bus replays on subscribe
+        self.replayed_event: Event | None = None
+        self.unsubscribe: Callable[[], None] | None = None
+
+    @property
+    def has_subscribers(self) -> bool:
+        """Return True, if any callback is subscribed."""
+        return bool(self.callbacks or self.keyed_callbacks)
+
+
+class DeebotEventRouter:
+    """Route the events of a device to the subscribed entities.
+
+    The router holds a single subscription on the device event bus per event type
+    and calls the subscribed callbacks directly instead of creating a task for each.
+    """
+
+    def __init__(self, device: Device, commands: DeebotCommandQueue) -> None:
+        self._device = device
+        self._commands = commands
+        self._routes: dict[type[Event], _Route] = {}
+        self._tasks: set[asyncio.Future[Any]] = set()
+        self._availability_callbacks: list[Callable[[bool], None]] = []
+        self._availability_unsubscribe: Callable[[], None] | None = None
+        self._last_received: dict[type[Event], float] = {}
+        self._refresh_requested: dict[type[Event], float] = {}
+
+    def teardown(self) -> None:
+        """Unsubscribe from the event bus of the device and drop all callbacks."""
+        for route in self._routes.values():
+            if route.unsubscribe is not None:
+                route.unsubscribe()
+        self._routes.clear()
+        if self._availability_unsubscribe is not None:
+            self._availability_unsubscribe()
+            self._availability_unsubscribe = None
+        self._availability_callbacks.clear()
+        for task in self._tasks:
+            task.cancel()
+
+    def request_refresh(self, event_type: type[Event], *, max_age: float = 0) -> bool:
+        """Request a refresh of the event.
+
+        The refresh is skipped, if the event was received within the last max_age
+        seconds or if the commands of a requested refresh are still queued or running.
+        Return True, if the refresh was requested.
+        """
+        now = time.monotonic()
+        received = self._last_received.get(event_type)
+        if received is not None and now - received < max_age:
+            _LOGGER.debug("%s is fresh. Skipping refresh", event_type.__name__)
+            return False
+
+        requested = self._refresh_requested.get(event_type)
+        if (
+            requested is not None
+            and (received is None or requested > received)
+            and now - requested < _REFRESH_TIMEOUT
+        ):
+            _LOGGER.debug("Refresh of %s is in-flight. Skipping", event_type.__name__)
+            return False
+
+        if self._device.events.has_subscribers(event_type):
+            self._refresh_requested[event_type] = now
+            create_task(self._tasks, self._async_refresh(event_type, now))
+        return True
+
+    async def _async_refresh(self, event_type: type[Event], requested: float) -> None:
+        """Execute the refresh commands of the event and mark it as done."""
+        try:
+            # User actions are sent before the refresh commands
+            await asyncio.gather(
+                *[
+                    self._commands.async_execute(
+                        command,
+                        key=("refresh", type(command)),
+                        priority=PRIORITY_BACKGROUND,
+                    )
+                    for command in self._device.capabilities.get_refresh_commands(
+                        event_type
+                    )
+                ],
+                return_exceptions=True,
+            )
+        finally:
+            if self._refresh_requested.get(event_type) == requested:
+                del self._refresh_requested[event_type]
+
+    def subscribe_availability(
+        self, callback: Callable[[bool], None]
+    ) -> Callable[[], None]:
+        """Subscribe to availability changes of the device.
+
+        All callbacks are called in a single pass on each availability change.
+        """
+        self._availability_callbacks.append(callback)
+
+        if self._availability_unsubscribe is None:
+            self._availability_unsubscribe = self._device.events.subscribe(
+                AvailabilityEvent, self._dispatch_availability
+            )
+        elif (
+            last_event := self._device.events.get_last_event(AvailabilityEvent)
+        ) is not None:
+            asyncio.get_running_loop().call_soon(callback, last_event.available)
+
+        def unsubscribe() -> None:
+            self._availability_callbacks.remove(callback)
+            if not self._availability_callbacks and self._availability_unsubscribe:
+                self._availability_unsubscribe()
+                self._availability_unsubscribe = None
+
+        return unsubscribe
+
+    async def _dispatch_availability(self, event: AvailabilityEvent) -> None:
+        """Pass the availability to all subscribed callbacks."""
+        for callback in self._availability_callbacks.copy():
+            try:
+                callback(event.available)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("An exception occurred during handling %s", event)
+
+    def subscribe(
+        self,
+        event_type: type[T],
+        callback: Callable[[T], Coroutine[Any, Any, None]],
+        *,
+        key: Hashable | None = None,
+    ) -> Callable[[], None]:
+        """Subscribe to event.
+
+        If a key is given, only events with the same key are passed to the callback.
+        """
+        if (route := self._routes.get(event_type)) is None:
+            route = self._routes[event_type] = _Route(_EVENT_KEY_FNS.get(event_type))
+
+        if key is None:
+            callbacks = route.callbacks
+        else:
+            if route.key_fn is None:
+                raise ValueError(f"{event_type.__name__} does not support keys")
+            callbacks = route.keyed_callbacks.setdefault(key, [])
+        callbacks.append(callback)
+
+        if route.unsubscribe is None:
+            # The event bus notifies the router directly with the last event
+            route.replayed_event = self._device.events.get_last_event(event_type)
+            route.unsubscribe = self._device.events.subscribe(
+                event_type, partial(self._dispatch, route)
+            )
+        elif key is not None:
+            if (last_event := route.last_keyed_events.get(key)) is not None:
+                create_task(self._tasks, callback(last_event))  # type: ignore[arg-type]
+        elif (last_event := self._device.events.get_last_event(event_type)) is not None:
+            create_task(self._tasks, callback(last_event))
+
+        def unsubscribe() -> None:
+            callbacks.remove(callback)
+            if key is not None and not callbacks:
+                route.keyed_callbacks.pop(key, None)
+
+            if not route.has_subscribers and self._routes.get(event_type) is route:
+                if route.unsubscribe is not None:
+                    route.unsubscribe()
+                del self._routes[event_type]
+
+        return unsubscribe
+
+    async def _dispatch(self, route: _Route, event: Event) -> None:
+        """Pass the event to all interested callbacks."""
+        if event is route.replayed_event:
+            # Not an answer of the bot, so the event is not marked as received
+            route.replayed_event = None
+        else:
+            self._last_received[type(event)] = time.monotonic()
+        callbacks = route.callbacks.copy()
+        if route.key_fn is not None:
+            key = route.key_fn(event)
+            route.last_keyed_events[key] = event
+            callbacks.extend(route.keyed_callbacks.get(key, ()))
+
+        for callback in callbacks:
+            try:
+                await callback(event)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("An exception occurred during handling %s", event)
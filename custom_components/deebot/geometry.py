@@ -0,0 +1,41 @@
+"""Map geometry module."""
+import re
+from typing import Any
+
+from deebot_client.device import Device
+from deebot_client.events.map import PositionsEvent, PositionType
+from deebot_client.models import Room
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _parse_polygon(coordinates: str) -> list[list[int]]:
+    """Parse the coordinates of a room into a list of [x, y] points."""
+    values = [round(float(value)) for value in _NUMBER.findall(coordinates)]
+    return [[values[i], values[i + 1]] for i in range(0, len(values) - 1, 2)]
+
+
+def build_room_geometry(rooms: list[Room]) -> dict[str, Any]:
+    """Build the room polygons and the map bounds."""
+    geometry_rooms = []
+    xs: list[int] = []
+    ys: list[int] = []
+    for room in rooms:
+        polygon = _parse_polygon(room.coordinates)
+        xs.extend(point[0] for point in polygon)
+        ys.extend(point[1] for point in polygon)
+        geometry_rooms.append({"id": room.id, "name": room.name, "polygon": polygon})
+
+    return {
+        "rooms": geometry_rooms,
+        "bounds": [min(xs), min(ys), max(xs), max(ys)] if xs else None,
+    }
+
+
+def get_dock_position(device: Device) -> list[int] | None:
+    """Return the last known [x, y] position of the dock."""
+    if positions_event := device.events.get_last_event(PositionsEvent):
+        for position in positions_event.positions:
+            if position.type == PositionType.CHARGER:
+                return [position.x, position.y]
+    return None
@@ -1,21 +1,104 @@
 """Support for Deebot image entities."""
-import base64
-from collections.abc import MutableMapping, Sequence
+import logging
+import time
+from collections.abc import Callable, Mapping, MutableMapping, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from enum import IntFlag
 from typing import Any
 
+import voluptuous as vol
 from deebot_client.capabilities import CapabilityMap
-from deebot_client.device import Device
+from deebot_client.events import StateEvent
 from deebot_client.events.map import CachedMapInfoEvent, MapChangedEvent
-from homeassistant.components.image import ImageEntity
+from deebot_client.models import State
+from homeassistant.components.image import TOKEN_CHANGE_INTERVAL, ImageEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import entity_platform
+from homeassistant.helpers.config_validation import make_entity_service_schema
 from homeassistant.helpers.entity import EntityDescription
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .bot import DeebotBot
+from .const import (
+    CONF_MAP_IDLE_TIMEOUT,
+    CONF_MAP_UPDATE_INTERVAL,
+    CONF_MAP_UPDATE_INTERVAL_CLEANING,
+    DEFAULT_MAP_IDLE_TIMEOUT,
+    DEFAULT_MAP_UPDATE_INTERVAL,
+    DEFAULT_MAP_UPDATE_INTERVAL_CLEANING,
+    DOMAIN,
+)
 from .controller import DeebotController
 from .entity import DeebotEntity
 
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds after the last image request, in which the map counts as viewed
+_VIEWED_TIMEOUT = 60
+# Maximum number of positions in the trail attribute
+_TRAIL_ATTRIBUTE_POINTS = 100
+_ATTR_TRAIL = "trail"
+
+# Must be kept in sync with services.yaml
+SERVICE_KEEP_ALIVE = "keep_alive"
+SERVICE_KEEP_ALIVE_DURATION = "duration"
+SERVICE_KEEP_ALIVE_SCHEMA = make_entity_service_schema(
+    {
+        vol.Required(SERVICE_KEEP_ALIVE_DURATION): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        )
+    }
+)
+SERVICE_EXPORT_TRAIL = "export_trail"
+SERVICE_EXPORT_TRAIL_SCHEMA = make_entity_service_schema({})
+
+
+class DeebotMapFeature(IntFlag):
+    """Supported features of the map entities."""
+
+    KEEP_ALIVE = 1
+    EXPORT_TRAIL = 2
+
+
+@dataclass(kw_only=True)
+class DeebotMapEntityDescription(
+    EntityDescription,  # type: ignore
+):
+    """Deebot map entity description."""
+
+    # Width of the image in pixels. None means full size
+    width: int | None = None
+
+
+ENTITY_DESCRIPTIONS: tuple[DeebotMapEntityDescription, ...] = (
+    DeebotMapEntityDescription(
+        key="map",
+        translation_key="map",
+        entity_registry_enabled_default=False,
+    ),
+    DeebotMapEntityDescription(
+        key="map_preview",
+        translation_key="map_preview",
+        entity_registry_enabled_default=False,
+        width=480,
+    ),
+    DeebotMapEntityDescription(
+        key="map_thumbnail",
+        translation_key="map_thumbnail",
+        entity_registry_enabled_default=False,
+        width=160,
+    ),
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -26,11 +109,33 @@ async def async_setup_entry(
     controller: DeebotController = hass.data[DOMAIN][config_entry.entry_id]
 
     def image_entity_generator(
-        device: Device,
-    ) -> Sequence[DeebotMap]:
-        new_entities = []
-        if caps := device.capabilities.map:
-            new_entities.append(DeebotMap(hass, device, caps))
+        bot: DeebotBot,
+    ) -> Sequence[DeebotEntity[CapabilityMap, DeebotMapEntityDescription]]:
+        new_entities: list[DeebotEntity[CapabilityMap, DeebotMapEntityDescription]] = []
+        if caps := bot.device.capabilities.map:
+            for description in ENTITY_DESCRIPTIONS:
+                new_entities.append(
+                    DeebotMap(hass, bot, caps, description, controller.config)
+                )
+
+            device_map = bot.device_map
+            stored_map_ids: set[str] = set()
+
+            @callback  # type: ignore[misc]
+            def on_map_stored() -> None:
+                if new_map_ids := device_map.stored_maps.keys() - stored_map_ids:
+                    stored_map_ids.update(new_map_ids)
+                    controller.add_bot_entities(
+                        bot,
+                        [
+                            DeebotStoredMap(hass, bot, caps, map_id)
+                            for map_id in new_map_ids
+                        ],
+                        async_add_entities,
+                    )
+
+            # Released together with the bot
+            device_map.add_store_listener(on_map_stored)
 
         return new_entities
 
@@ -38,53 +143,274 @@ async def async_setup_entry(
         async_add_entities, image_entity_generator
     )
 
+    platform = entity_platform.async_get_current_platform()
+
+    platform.async_register_entity_service(
+        SERVICE_KEEP_ALIVE,
+        SERVICE_KEEP_ALIVE_SCHEMA,
+        "service_keep_alive",
+        required_features=[DeebotMapFeature.KEEP_ALIVE],
+    )
+    platform.async_register_entity_service(
+        SERVICE_EXPORT_TRAIL,
+        SERVICE_EXPORT_TRAIL_SCHEMA,
+        "service_export_trail",
+        required_features=[DeebotMapFeature.EXPORT_TRAIL],
+        supports_response=SupportsResponse.ONLY,
+    )
+
 
 class DeebotMap(
-    DeebotEntity[CapabilityMap, EntityDescription],
+    DeebotEntity[CapabilityMap, DeebotMapEntityDescription],
     ImageEntity,  # type: ignore
 ):
     """Deebot map."""
 
-    _attr_should_poll = True
+    _attr_supported_features = (
+        DeebotMapFeature.KEEP_ALIVE | DeebotMapFeature.EXPORT_TRAIL
+    )
+    _unrecorded_attributes = frozenset({_ATTR_TRAIL})
 
-    def __init__(self, hass: HomeAssistant, device: Device, capability: CapabilityMap):
-        super().__init__(
-            device,
-            capability,
-            EntityDescription(
-                key="map",
-                translation_key="map",
-                entity_registry_enabled_default=False,
-            ),
-            hass=hass,
-        )
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        bot: DeebotBot,
+        capability: CapabilityMap,
+        entity_description: DeebotMapEntityDescription,
+        config: Mapping[str, Any],
+    ):
+        super().__init__(bot, capability, entity_description, hass=hass)
         self._attr_extra_state_attributes: MutableMapping[str, Any] = {}
+        self._device_map = bot.device_map
+        self._update_interval: float = config.get(
+            CONF_MAP_UPDATE_INTERVAL, DEFAULT_MAP_UPDATE_INTERVAL
+        )
+        self._update_interval_cleaning: float = config.get(
+            CONF_MAP_UPDATE_INTERVAL_CLEANING, DEFAULT_MAP_UPDATE_INTERVAL_CLEANING
+        )
+        self._pending_update: datetime | None = None
+        self._cancel_update: Callable[[], None] | None = None
+        self._last_update = 0.0
+        self._last_requested = 0.0
+        self._idle_timeout: float = config.get(
+            CONF_MAP_IDLE_TIMEOUT, DEFAULT_MAP_IDLE_TIMEOUT
+        )
+        self._map_enabled = False
+        self._enabled_until = 0.0
+        self._cancel_idle: Callable[[], None] | None = None
 
-    def image(self) -> bytes | None:
-        """Return bytes of image."""
-        return base64.decodebytes(self._device.map.get_base64_map())
+    async def async_image(self) -> bytes | None:
+        """Return bytes of image.
+
+        The image is only rebuilt if the map has changed since the last build.
+        """
+        self._last_requested = time.monotonic()
+        self._async_keep_alive(self._idle_timeout)
+        return await self._device_map.async_get_image(
+            self.hass, self.entity_description.width
+        )
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return entity specific state attributes.
+
+        The trail is only added to the full size map.
+        """
+        if self.entity_description.width is not None:
+            return self._attr_extra_state_attributes
+
+        trail = self._device_map.trail.simplified(_TRAIL_ATTRIBUTE_POINTS)
+        return {**self._attr_extra_state_attributes, _ATTR_TRAIL: trail.tolist()}
+
+    async def service_export_trail(self) -> ServiceResponse:
+        """Service to export all positions of the current clean job."""
+        return {"positions": self._device_map.trail.points().tolist()}
 
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
         await super().async_added_to_hass()
 
-        self._device.map.enable()
-
         async def on_info(event: CachedMapInfoEvent) -> None:
             self._attr_extra_state_attributes["map_name"] = event.name
 
         async def on_changed(event: MapChangedEvent) -> None:
-            self._attr_image_last_updated = event.when
-            self.async_write_ha_state()
+            self._pending_update = event.when
+            self._async_throttle_update()
+
+        async def on_state(event: StateEvent) -> None:
+            if event.state in (State.CLEANING, State.RETURNING) and self._was_viewed():
+                # An open dashboard only fetches again, when the image changes
+                self._async_keep_alive(self._idle_timeout)
+
+        @callback  # type: ignore[misc]
+        def on_switch() -> None:
+            # Show the stored image of the new map without waiting for the throttle
+            self._attr_image_last_updated = dt_util.utcnow()
+            self._last_update = time.monotonic()
+            self.async_schedule_write_state()
 
         subscriptions = [
-            self._device.events.subscribe(self._capability.chached_info.event, on_info),
-            self._device.events.subscribe(self._capability.changed.event, on_changed),
+            self._events.subscribe(self._capability.chached_info.event, on_info),
+            self._events.subscribe(self._capability.changed.event, on_changed),
+            self._events.subscribe(StateEvent, on_state),
+            self._device_map.track_trail(),
+            self._device_map.add_switch_listener(on_switch),
         ]
 
         def on_remove() -> None:
             for unsubscribe in subscriptions:
                 unsubscribe()
-            self._device.map.disable()
+            if self._cancel_update is not None:
+                self._cancel_update()
+                self._cancel_update = None
+            if self._cancel_idle is not None:
+                self._cancel_idle()
+                self._cancel_idle = None
+            self._async_disable_map()
 
         self.async_on_remove(on_remove)
+
+    @callback  # type: ignore[misc]
+    def _async_throttle_update(self) -> None:
+        """Publish the pending map change, at most once per update interval.
+
+        A change within the interval is published at its end, so the last change
+        is never lost.
+        """
+        if self._cancel_update is not None:
+            return
+
+        interval = self._update_interval
+        if (
+            self._device_map.cleaning
+            and time.monotonic() - self._last_requested < _VIEWED_TIMEOUT
+        ):
+            interval = self._update_interval_cleaning
+
+        if (remaining := self._last_update + interval - time.monotonic()) > 0:
+            self._cancel_update = async_call_later(
+                self.hass, remaining, self._async_on_update_interval
+            )
+            return
+
+        if self._pending_update is not None:
+            self._attr_image_last_updated = self._pending_update
+            self._pending_update = None
+            self._last_update = time.monotonic()
+            self.async_schedule_write_state()
+
+    @callback  # type: ignore[misc]
+    def _async_on_update_interval(self, _: datetime) -> None:
+        """Publish the map change, which was held back by the throttle."""
+        self._cancel_update = None
+        self._async_throttle_update()
+
+    def _was_viewed(self) -> bool:
+        """Return True, if the image was requested within the keep-alive window.
+
+        The window includes the rotation of the access token, as an open dashboard
+        requests the image at least on each rotation.
+        """
+        window = self._idle_timeout + TOKEN_CHANGE_INTERVAL.total_seconds()
+        return bool(self._last_requested) and (
+            time.monotonic() - self._last_requested < window
+        )
+
+    async def service_keep_alive(self, duration: int) -> None:
+        """Service to collect the map data for the given duration in seconds."""
+        self._async_keep_alive(duration)
+
+    @callback  # type: ignore[misc]
+    def _async_keep_alive(self, duration: float) -> None:
+        """Enable the map for at least the given duration in seconds."""
+        if not self._map_enabled:
+            _LOGGER.debug("Enabling map")
+            self._map_enabled = True
+            self._device_map.enable()
+
+        until = time.monotonic() + duration
+        if until <= self._enabled_until:
+            return
+
+        self._enabled_until = until
+        if self._cancel_idle is not None:
+            self._cancel_idle()
+        self._cancel_idle = async_call_later(
+            self.hass, duration, self._async_on_idle_timeout
+        )
+
+    @callback  # type: ignore[misc]
+    def _async_on_idle_timeout(self, _: datetime) -> None:
+        """Disable the map as nobody requested it for too long."""
+        self._cancel_idle = None
+        self._async_disable_map()
+
+    @callback  # type: ignore[misc]
+    def _async_disable_map(self) -> None:
+        """Disable the map."""
+        if not self._map_enabled:
+            return
+
+        _LOGGER.debug("Disabling map")
+        self._map_enabled = False
+        self._enabled_until = 0.0
+        self._device_map.disable()
+
+
+class DeebotStoredMap(
+    DeebotEntity[CapabilityMap, DeebotMapEntityDescription],
+    ImageEntity,  # type: ignore
+):
+    """Last image of a stored map (floor), which is served without the cloud."""
+
+    _always_available = True
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        bot: DeebotBot,
+        capability: CapabilityMap,
+        map_id: str,
+    ):
+        super().__init__(
+            bot,
+            capability,
+            DeebotMapEntityDescription(
+                key=f"map_{map_id}",
+                entity_registry_enabled_default=False,
+            ),
+            hass=hass,
+        )
+        self._map_id = map_id
+        self._device_map = bot.device_map
+        self._attr_extra_state_attributes = {"map_id": map_id}
+        self._update_from_stored_map()
+
+    def _update_from_stored_map(self) -> bool:
+        """Update the name and the last update time. Return True, if changed."""
+        if (stored_map := self._device_map.stored_maps.get(self._map_id)) is None:
+            return False
+
+        if stored_map.updated == self.image_last_updated:
+            return False
+
+        self._attr_name = f"Map {stored_map.name or self._map_id}"
+        self._attr_image_last_updated = stored_map.updated
+        return True
+
+    async def async_image(self) -> bytes | None:
+        """Return bytes of image."""
+        if (stored_map := self._device_map.stored_maps.get(self._map_id)) is None:
+            return None
+        return stored_map.image
+
+    async def async_added_to_hass(self) -> None:
+        """Set up the event listeners now that hass is ready."""
+        await super().async_added_to_hass()
+
+        @callback  # type: ignore[misc]
+        def on_map_stored() -> None:
+            if self._update_from_stored_map():
+                self.async_schedule_write_state()
+
+        self.async_on_remove(self._device_map.add_store_listener(on_map_stored))
@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import Generic
 
 from deebot_client.capabilities import CapabilitySet
-from homeassistant.components.number import NumberEntity, NumberEntityDescription
+from homeassistant.components.number import NumberEntityDescription, RestoreNumber
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
@@ -91,10 +91,19 @@ async def async_setup_entry(
 
 class DeebotNumberEntity(
     DeebotEntity[CapabilitySet[EventT, int], DeebotNumberEntityDescription],
-    NumberEntity,  # type: ignore
+    RestoreNumber,  # type: ignore
 ):
     """Deebot number entity."""
 
+    async def _async_restore_state(self) -> None:
+        """Restore the last known value."""
+        if (last_data := await self.async_get_last_number_data()) is not None:
+            self._attr_native_value = last_data.native_value
+            if last_data.native_max_value is not None:
+                self._attr_native_max_value = last_data.native_max_value
+            if icon := self.entity_description.icon_fn(self):
+                self._attr_icon = icon
+
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
         await super().async_added_to_hass()
@@ -105,12 +114,10 @@ class DeebotNumberEntity(
                 self._attr_native_max_value = maximum
             if icon := self.entity_description.icon_fn(self):
                 self._attr_icon = icon
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
-        self.async_on_remove(
-            self._device.events.subscribe(self._capability.event, on_event)
-        )
+        self.async_on_remove(self._events.subscribe(self._capability.event, on_event))
 
     async def async_set_native_value(self, value: float) -> None:
         """Set new value."""
-        await self._device.execute_command(self._capability.set(int(value)))
+        await self._async_execute_set(self._capability.set(int(value)))
@@ -4,13 +4,14 @@ from dataclasses import dataclass
 from typing import Any, Generic
 
 from deebot_client.capabilities import CapabilitySetTypes
-from deebot_client.device import Device
 from homeassistant.components.select import SelectEntity, SelectEntityDescription
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 
+from .bot import DeebotBot
 from .const import DOMAIN
 from .controller import DeebotController
 from .entity import DeebotEntity, DeebotEntityDescription, EventT
@@ -67,6 +68,7 @@ async def async_setup_entry(
 class DeebotSelectEntity(
     DeebotEntity[CapabilitySetTypes[EventT, str], DeebotSelectEntityDescription],
     SelectEntity,  # type: ignore
+    RestoreEntity,  # type: ignore
 ):
     """Deebot select entity."""
 
@@ -74,26 +76,33 @@ class DeebotSelectEntity(
 
     def __init__(
         self,
-        device: Device,
+        bot: DeebotBot,
         capability: CapabilitySetTypes[EventT, str],
         entity_description: DeebotSelectEntityDescription | None = None,
         **kwargs: Any,
     ):
-        super().__init__(device, capability, entity_description, **kwargs)
+        super().__init__(bot, capability, entity_description, **kwargs)
         self._attr_options = self.entity_description.options_fn(capability)
 
+    async def _async_restore_state(self) -> None:
+        """Restore the last known option."""
+        if (last_state := await self.async_get_last_state()) is not None and (
+            last_state.state in self._attr_options
+        ):
+            self._attr_current_option = last_state.state
+
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
         await super().async_added_to_hass()
 
         async def on_water_info(event: EventT) -> None:
             self._attr_current_option = self.entity_description.current_option_fn(event)
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
         self.async_on_remove(
-            self._device.events.subscribe(self._capability.event, on_water_info)
+            self._events.subscribe(self._capability.event, on_water_info)
         )
 
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
-        await self._device.execute_command(self._capability.set(option))
+        await self._async_execute_set(self._capability.set(option))
@@ -5,7 +5,6 @@ from math import floor
 from typing import Any, Generic, TypeVar
 
 from deebot_client.capabilities import CapabilityEvent, CapabilityLifeSpan
-from deebot_client.device import Device
 from deebot_client.events import (
     BatteryEvent,
     CleanLogEvent,
@@ -18,8 +17,8 @@ from deebot_client.events import (
     TotalStatsEvent,
 )
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
-    SensorEntity,
     SensorEntityDescription,
     SensorStateClass,
 )
@@ -37,9 +36,10 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
 
+from .bot import DeebotBot
 from .const import DOMAIN
 from .controller import DeebotController
-from .entity import DeebotEntity, DeebotEntityDescription, EventT
+from .entity import CapabilityT, DeebotEntity, DeebotEntityDescription, EventT
 
 
 @dataclass(kw_only=True)
@@ -231,25 +231,25 @@ async def async_setup_entry(
     )
 
     def last_error_entity_generator(
-        device: Device,
+        bot: DeebotBot,
     ) -> Sequence[LastErrorSensor]:
-        if capability := device.capabilities.error:
-            return [(LastErrorSensor(device, capability))]
+        if capability := bot.device.capabilities.error:
+            return [(LastErrorSensor(bot, capability))]
         return []
 
     def last_cleaning_entity_generator(
-        device: Device,
+        bot: DeebotBot,
     ) -> Sequence[LastCleaningSensor]:
-        if capability := device.capabilities.clean.log:
-            return [(LastCleaningSensor(device, capability))]
+        if capability := bot.device.capabilities.clean.log:
+            return [(LastCleaningSensor(bot, capability))]
         return []
 
-    def life_span_entity_generator(device: Device) -> Sequence[LifeSpanSensor]:
+    def life_span_entity_generator(bot: DeebotBot) -> Sequence[LifeSpanSensor]:
         new_entities = []
-        capability = device.capabilities.life_span
+        capability = bot.device.capabilities.life_span
         for description in LIFE_SPAN_DESCRIPTIONS:
             if description.component in capability.types:
-                new_entities.append(LifeSpanSensor(device, capability, description))
+                new_entities.append(LifeSpanSensor(bot, capability, description))
         return new_entities
 
     controller.register_platform_add_entities_generator(
@@ -262,9 +262,25 @@ async def async_setup_entry(
     )
 
 
+_SensorEntityDescriptionT = TypeVar(
+    "_SensorEntityDescriptionT", bound=SensorEntityDescription
+)
+
+
+class DeebotRestoreSensor(
+    DeebotEntity[CapabilityT, _SensorEntityDescriptionT],
+    RestoreSensor,  # type: ignore
+):
+    """Deebot sensor, which restores the last known native value."""
+
+    async def _async_restore_state(self) -> None:
+        """Restore the last known native value."""
+        if (last_data := await self.async_get_last_sensor_data()) is not None:
+            self._attr_native_value = last_data.native_value
+
+
 class DeebotSensor(
-    DeebotEntity[CapabilityEvent, DeebotSensorEntityDescription],
-    SensorEntity,  # type: ignore
+    DeebotRestoreSensor[CapabilityEvent, DeebotSensorEntityDescription],
 ):
     """Deebot sensor."""
 
@@ -280,19 +296,16 @@ class DeebotSensor(
             self._attr_native_value = value
             if attr_fn := self.entity_description.extra_state_attributes_fn:
                 self._attr_extra_state_attributes = attr_fn(event)
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
-        self.async_on_remove(
-            self._device.events.subscribe(self._capability.event, on_event)
-        )
+        self.async_on_remove(self._events.subscribe(self._capability.event, on_event))
 
 
 T = TypeVar("T", bound=Event)
 
 
 class LifeSpanSensor(
-    DeebotEntity[CapabilityLifeSpan, DeebotLifeSpanSensorEntityDescription],
-    SensorEntity,  # type: ignore
+    DeebotRestoreSensor[CapabilityLifeSpan, DeebotLifeSpanSensorEntityDescription],
 ):
     """Life span sensor."""
 
@@ -301,21 +314,23 @@ class LifeSpanSensor(
         await super().async_added_to_hass()
 
         async def on_event(event: LifeSpanEvent) -> None:
-            if event.type == self.entity_description.component:
-                self._attr_native_value = event.percent
-                self._attr_extra_state_attributes = {
-                    "remaining": floor(event.remaining / 60)
-                }
-                self.async_write_ha_state()
+            self._attr_native_value = event.percent
+            self._attr_extra_state_attributes = {
+                "remaining": floor(event.remaining / 60)
+            }
+            self.async_schedule_write_state()
 
         self.async_on_remove(
-            self._device.events.subscribe(self._capability.event, on_event)
+            self._events.subscribe(
+                self._capability.event,
+                on_event,
+                key=self.entity_description.component,
+            )
         )
 
 
 class LastErrorSensor(
-    DeebotEntity[CapabilityEvent[ErrorEvent], SensorEntityDescription],
-    SensorEntity,  # type: ignore
+    DeebotRestoreSensor[CapabilityEvent[ErrorEvent], SensorEntityDescription],
 ):
     """Last error sensor."""
 
@@ -337,16 +352,13 @@ class LastErrorSensor(
             self._attr_native_value = event.code
             self._attr_extra_state_attributes = {CONF_DESCRIPTION: event.description}
 
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
-        self.async_on_remove(
-            self._device.events.subscribe(self._capability.event, on_event)
-        )
+        self.async_on_remove(self._events.subscribe(self._capability.event, on_event))
 
 
 class LastCleaningSensor(
-    DeebotEntity[CapabilityEvent[CleanLogEvent], SensorEntityDescription],
-    SensorEntity,  # type: ignore
+    DeebotRestoreSensor[CapabilityEvent[CleanLogEvent], SensorEntityDescription],
 ):
     """Last cleaning sensor."""
 
@@ -374,8 +386,6 @@ class LastCleaningSensor(
                     "duration": log.duration / 60,
                 }
 
-                self.async_write_ha_state()
+                self.async_schedule_write_state()
 
-        self.async_on_remove(
-            self._device.events.subscribe(self._capability.event, on_event)
-        )
+        self.async_on_remove(self._events.subscribe(self._capability.event, on_event))
@@ -0,0 +1,109 @@
+"""Domain services for deebot."""
+import asyncio
+import logging
+import time
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import config_validation as cv
+
+from .const import COMMAND_DISPATCH_CONCURRENCY, DOMAIN
+from .controller import DeebotController
+from .vacuum import DeebotVacuum
+
+_LOGGER = logging.getLogger(__name__)
+
+# Must be kept in sync with services.yaml
+SERVICE_SEND_COMMAND = "send_command"
+SERVICE_SEND_COMMAND_COMMAND = "command"
+SERVICE_SEND_COMMAND_PARAMS = "params"
+SERVICE_SEND_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(SERVICE_SEND_COMMAND_COMMAND): cv.string,
+        vol.Optional(SERVICE_SEND_COMMAND_PARAMS): dict,
+    }
+)
+
+
+@callback  # type: ignore[misc]
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the domain services."""
+
+    async def send_command(call: ServiceCall) -> ServiceResponse:
+        """Send a command to all given vacuums at the same time.
+
+        The result only tells, whether the command was sent. The library does not
+        report, whether the bot has executed it.
+        """
+        command: str = call.data[SERVICE_SEND_COMMAND_COMMAND]
+        params: dict[str, Any] | None = call.data.get(SERVICE_SEND_COMMAND_PARAMS)
+        semaphore = asyncio.Semaphore(COMMAND_DISPATCH_CONCURRENCY)
+
+        async def dispatch(entity_id: str) -> dict[str, Any]:
+            if (vacuum := _get_vacuum(hass, entity_id)) is None:
+                return {"sent": False, "error": "Vacuum not found"}
+
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await _async_execute(vacuum, command, params)
+                except Exception as ex:  # pylint: disable=broad-except
+                    _LOGGER.debug(
+                        "Sending %s to %s failed", command, entity_id, exc_info=True
+                    )
+                    result: dict[str, Any] = {"sent": False, "error": str(ex)}
+                else:
+                    result = {"sent": True}
+                result["duration"] = round(time.perf_counter() - start, 3)
+            return result
+
+        entity_ids: list[str] = call.data[ATTR_ENTITY_ID]
+        results = await asyncio.gather(
+            *(dispatch(entity_id) for entity_id in entity_ids)
+        )
+        return {"results": dict(zip(entity_ids, results, strict=True))}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEND_COMMAND,
+        send_command,
+        SERVICE_SEND_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _get_vacuum(hass: HomeAssistant, entity_id: str) -> DeebotVacuum | None:
+    """Return the vacuum entity with the given entity id."""
+    for controller in hass.data.get(DOMAIN, {}).values():
+        if isinstance(controller, DeebotController) and isinstance(
+            entity := controller.get_entity(entity_id), DeebotVacuum
+        ):
+            return entity
+    return None
+
+
+async def _async_execute(
+    vacuum: DeebotVacuum, command: str, params: dict[str, Any] | None
+) -> None:
+    """Execute the command on the vacuum."""
+    if command == "start":
+        await vacuum.async_start()
+    elif command == "stop":
+        await vacuum.async_stop()
+    elif command == "pause":
+        await vacuum.async_pause()
+    elif command == "return_to_base":
+        await vacuum.async_return_to_base()
+    elif command == "locate":
+        await vacuum.async_locate()
+    else:
+        await vacuum.async_send_command(command, params)
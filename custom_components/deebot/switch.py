@@ -6,9 +6,11 @@ from deebot_client.capabilities import CapabilitySetEnable
 from deebot_client.events import EnableEvent
 from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import STATE_ON
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import DOMAIN
 from .controller import DeebotController
@@ -82,27 +84,31 @@ async def async_setup_entry(
 class DeebotSwitchEntity(
     DeebotEntity[CapabilitySetEnable, DeebotSwitchEntityDescription],
     SwitchEntity,  # type: ignore
+    RestoreEntity,  # type: ignore
 ):
     """Deebot switch entity."""
 
     _attr_is_on = False
 
+    async def _async_restore_state(self) -> None:
+        """Restore the last known state."""
+        if (last_state := await self.async_get_last_state()) is not None:
+            self._attr_is_on = last_state.state == STATE_ON
+
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
         await super().async_added_to_hass()
 
         async def on_enable(event: EnableEvent) -> None:
             self._attr_is_on = event.enable
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
-        self.async_on_remove(
-            self._device.events.subscribe(self._capability.event, on_enable)
-        )
+        self.async_on_remove(self._events.subscribe(self._capability.event, on_enable))
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the entity on."""
-        await self._device.execute_command(self._capability.set(True))
+        await self._async_execute_set(self._capability.set(True))
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the entity off."""
-        await self._device.execute_command(self._capability.set(False))
+        await self._async_execute_set(self._capability.set(False))
@@ -0,0 +1,52 @@
+"""Position trail module."""
+import numpy as np
+from numpy.typing import NDArray
+
+
+class PositionTrail:
+    """Positions of a bot, stored in a ring buffer with a fixed capacity."""
+
+    def __init__(self, capacity: int) -> None:
+        self._points: NDArray[np.int32] = np.zeros((capacity, 2), dtype=np.int32)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, x: int, y: int) -> bool:
+        """Append the position, if it differs from the last one.
+
+        If the buffer is full, the oldest position is overwritten.
+        Return True, if the position was appended.
+        """
+        if self._size and self._points[self._next - 1].tolist() == [x, y]:
+            return False
+
+        self._points[self._next] = (x, y)
+        self._next = (self._next + 1) % len(self._points)
+        self._size = min(self._size + 1, len(self._points))
+        return True
+
+    def clear(self) -> None:
+        """Remove all positions."""
+        self._next = 0
+        self._size = 0
+
+    def points(self) -> NDArray[np.int32]:
+        """Return the positions from the oldest to the newest."""
+        if self._size < len(self._points):
+            return self._points[: self._size].copy()
+        return np.roll(self._points, -self._next, axis=0)
+
+    def simplified(self, max_points: int) -> NDArray[np.int32]:
+        """Return at most max_points evenly sampled positions.
+
+        The oldest and the newest position are always included.
+        """
+        points = self.points()
+        if len(points) <= max_points:
+            return points
+
+        indices = np.linspace(0, len(points) - 1, max_points).round().astype(np.intp)
+        return points[indices]
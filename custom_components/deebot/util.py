@@ -1,7 +1,9 @@
 """Util module."""
 import dataclasses
+from collections.abc import Callable
 from enum import Enum
-from typing import Any
+from types import UnionType
+from typing import Any, Union, get_args, get_origin, get_type_hints
 
 from deebot_client.util import DisplayNameIntEnum
 from homeassistant.core import HomeAssistant
@@ -17,16 +19,76 @@ def get_bumper_device_id(hass: HomeAssistant) -> str:
     return f"Deebot-4-HA_{location_name}_{uuid.random_uuid_hex()[:4]}"
 
 
+_Converter = Callable[[Any], Any]
+_FieldPlan = tuple[tuple[str, _Converter | None], ...]
+
+_FIELD_PLANS: dict[type, _FieldPlan] = {}
+
+
+def _display_name(value: DisplayNameIntEnum) -> str:
+    return value.display_name
+
+
+def _enum_value(value: Enum) -> Any:
+    return value.value
+
+
+def _convert_any(value: Any) -> Any:
+    """Convert a value, which type is not known in advance."""
+    if isinstance(value, DisplayNameIntEnum):
+        return value.display_name
+    if isinstance(value, Enum):
+        return value.value
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    return value
+
+
+def _get_converter(hint: Any) -> _Converter | None:
+    """Return the converter for a field with the given type hint."""
+    if get_origin(hint) in (Union, UnionType):
+        converters = {
+            _get_converter(arg) for arg in get_args(hint) if arg is not type(None)
+        }
+        if len(converters) == 1:
+            return converters.pop()
+        return _convert_any
+
+    if isinstance(hint, type):
+        if issubclass(hint, DisplayNameIntEnum):
+            return _display_name
+        if issubclass(hint, Enum):
+            return _enum_value
+        if dataclasses.is_dataclass(hint):
+            return dataclasses.asdict
+    elif hint is Any:
+        return _convert_any
+    return None
+
+
+def _get_field_plan(cls: type) -> _FieldPlan:
+    """Return the fields of the dataclass together with their converter."""
+    if (plan := _FIELD_PLANS.get(cls)) is None:
+        try:
+            hints = get_type_hints(cls)
+        except Exception:  # pylint: disable=broad-except
+            hints = {}
+        plan = _FIELD_PLANS[cls] = tuple(
+            (field.name, _get_converter(hints.get(field.name, Any)))
+            for field in dataclasses.fields(cls)
+        )
+    return plan
+
+
 def dataclass_to_dict(obj: Any) -> dict[str, Any]:
-    """Convert dataclass to dict and remove None fields."""
-    dic = dataclasses.asdict(obj)
-    for key, value in dic.copy().items():
-        if value is None:
-            dic.pop(key)
-        elif isinstance(value, Enum):
-            if isinstance(value, DisplayNameIntEnum):
-                dic[key] = value.display_name
-            else:
-                dic[key] = value.value
+    """Convert dataclass to dict and remove None fields.
+
+    Enums are converted to their value or display name. The fields and their
+    converters are determined once per class and values are not copied.
+    """
+    dic: dict[str, Any] = {}
+    for name, converter in _get_field_plan(type(obj)):
+        if (value := getattr(obj, name)) is not None:
+            dic[name] = value if converter is None else converter(value)
 
     return dic
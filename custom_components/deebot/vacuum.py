@@ -5,7 +5,6 @@ from typing import Any
 
 import voluptuous as vol
 from deebot_client.capabilities import Capabilities
-from deebot_client.device import Device
 from deebot_client.events import (
     BatteryEvent,
     CustomCommandEvent,
@@ -16,6 +15,8 @@ from deebot_client.events import (
 )
 from deebot_client.models import CleanAction, CleanMode, Room, State
 from homeassistant.components.vacuum import (
+    ATTR_BATTERY_LEVEL,
+    ATTR_FAN_SPEED,
     STATE_CLEANING,
     STATE_DOCKED,
     STATE_ERROR,
@@ -28,16 +29,21 @@ from homeassistant.components.vacuum import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import entity_platform
 from homeassistant.helpers.config_validation import make_entity_service_schema
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.util import slugify
+from homeassistant.util.read_only_dict import ReadOnlyDict
 
+from .bot import DeebotBot
 from .const import (
     DOMAIN,
     EVENT_CLEANING_JOB,
     EVENT_CUSTOM_COMMAND,
     REFRESH_MAP,
+    REFRESH_MAX_AGE,
     REFRESH_STR_TO_EVENT_DTO,
 )
 from .controller import DeebotController
@@ -46,6 +52,9 @@ from .util import dataclass_to_dict
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds the map is enabled after a manual refresh
+_MAP_REFRESH_KEEP_ALIVE = 60
+
 _STATE_TO_VACUUM_STATE = {
     State.IDLE: STATE_IDLE,
     State.CLEANING: STATE_CLEANING,
@@ -61,8 +70,8 @@ SERVICE_REFRESH = "refresh"
 SERVICE_REFRESH_CATEGORY = "category"
 SERVICE_REFRESH_SCHEMA = make_entity_service_schema(
     {
-        vol.Required(SERVICE_REFRESH_CATEGORY): vol.In(
-            [*REFRESH_STR_TO_EVENT_DTO.keys(), REFRESH_MAP]
+        vol.Required(SERVICE_REFRESH_CATEGORY): vol.All(
+            cv.ensure_list, [vol.In([*REFRESH_STR_TO_EVENT_DTO.keys(), REFRESH_MAP])]
         )
     }
 )
@@ -77,9 +86,9 @@ async def async_setup_entry(
     controller: DeebotController = hass.data[DOMAIN][config_entry.entry_id]
 
     def vacuum_entity_generator(
-        device: Device,
+        bot: DeebotBot,
     ) -> Sequence[DeebotVacuum]:
-        return [DeebotVacuum(device)]
+        return [DeebotVacuum(bot)]
 
     controller.register_platform_add_entities_generator(
         async_add_entities, vacuum_entity_generator
@@ -97,9 +106,29 @@ async def async_setup_entry(
 _ATTR_ROOMS = "rooms"
 
 
+def _get_room_ids_by_name(rooms: list[Room]) -> Mapping[str, int | tuple[int, ...]]:
+    """Return the room ids by the room name in snake_case.
+
+    Rooms with the same name are combined into a tuple of ids.
+    """
+    ids_by_name: dict[str, list[int]] = {}
+    for room in rooms:
+        # convert room name to snake_case to meet the convention
+        ids_by_name.setdefault(slugify(room.name), []).append(room.id)
+
+    room_ids: Mapping[str, int | tuple[int, ...]] = ReadOnlyDict(
+        {
+            name: ids[0] if len(ids) == 1 else tuple(ids)
+            for name, ids in ids_by_name.items()
+        }
+    )
+    return room_ids
+
+
 class DeebotVacuum(
     DeebotEntity[Capabilities, StateVacuumEntityDescription],
     StateVacuumEntity,  # type: ignore
+    RestoreEntity,  # type: ignore
 ):
     """Deebot Vacuum."""
 
@@ -117,66 +146,81 @@ class DeebotVacuum(
         | VacuumEntityFeature.START
     )
 
-    def __init__(self, device: Device):
+    def __init__(self, bot: DeebotBot):
         """Initialize the Deebot Vacuum."""
-        capabilities = device.capabilities
+        capabilities = bot.device.capabilities
         super().__init__(
-            device,
+            bot,
             capabilities,
             StateVacuumEntityDescription(key="", translation_key="bot", name=None),
         )
 
-        self._rooms: list[Room] = []
+        self._extra_state_attributes: Mapping[str, Any] = ReadOnlyDict()
+        self._device_map = bot.device_map
 
         self._attr_fan_speed_list = [
             level.display_name for level in capabilities.fan_speed.types
         ]
 
+    async def _async_restore_state(self) -> None:
+        """Restore the last known state, battery level and fan speed."""
+        if (last_state := await self.async_get_last_state()) is None:
+            return
+
+        if last_state.state in _STATE_TO_VACUUM_STATE.values():
+            self._attr_state = last_state.state
+        if (battery_level := last_state.attributes.get(ATTR_BATTERY_LEVEL)) is not None:
+            self._attr_battery_level = battery_level
+        if (fan_speed := last_state.attributes.get(ATTR_FAN_SPEED)) in (
+            self._attr_fan_speed_list
+        ):
+            self._attr_fan_speed = fan_speed
+
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
         await super().async_added_to_hass()
 
         async def on_battery(event: BatteryEvent) -> None:
             self._attr_battery_level = event.value
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
         async def on_custom_command(event: CustomCommandEvent) -> None:
             self.hass.bus.fire(EVENT_CUSTOM_COMMAND, dataclass_to_dict(event))
 
         async def on_fan_speed(event: FanSpeedEvent) -> None:
             self._attr_fan_speed = event.speed.display_name
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
         async def on_report_stats(event: ReportStatsEvent) -> None:
             self.hass.bus.fire(EVENT_CLEANING_JOB, dataclass_to_dict(event))
 
         async def on_rooms(event: RoomsEvent) -> None:
-            self._rooms = event.rooms
-            self.async_write_ha_state()
+            # Built once per change, as the attributes are read on every state write
+            if rooms := _get_room_ids_by_name(event.rooms):
+                self._extra_state_attributes = ReadOnlyDict({_ATTR_ROOMS: rooms})
+            else:
+                self._extra_state_attributes = ReadOnlyDict()
+            self.async_schedule_write_state()
 
         async def on_status(event: StateEvent) -> None:
             self._attr_state = _STATE_TO_VACUUM_STATE[event.state]
-            self.async_write_ha_state()
+            self.async_schedule_write_state()
 
         subscriptions = [
-            self._device.events.subscribe(self._capability.battery.event, on_battery),
-            self._device.events.subscribe(
-                self._capability.fan_speed.event, on_fan_speed
-            ),
-            self._device.events.subscribe(
+            self._events.subscribe(self._capability.battery.event, on_battery),
+            self._events.subscribe(self._capability.fan_speed.event, on_fan_speed),
+            self._events.subscribe(
                 self._capability.stats.report.event, on_report_stats
             ),
-            self._device.events.subscribe(self._capability.state.event, on_status),
+            self._events.subscribe(self._capability.state.event, on_status),
         ]
 
         if custom := self._capability.custom:
             subscriptions.append(
-                self._device.events.subscribe(custom.event, on_custom_command)
+                self._events.subscribe(custom.event, on_custom_command)
             )
         if map_caps := self._capability.map:
-            subscriptions.append(
-                self._device.events.subscribe(map_caps.rooms.event, on_rooms)
-            )
+            subscriptions.append(self._events.subscribe(map_caps.rooms.event, on_rooms))
 
         def unsubscribe() -> None:
             for sub in subscriptions:
@@ -191,32 +235,15 @@ class DeebotVacuum(
         Implemented by platform classes. Convention for attribute names
         is lowercase snake_case.
         """
-        attributes: dict[str, Any] = {}
-        rooms: dict[str, Any] = {}
-        for room in self._rooms:
-            # convert room name to snake_case to meet the convention
-            room_name = slugify(room.name)
-            room_values = rooms.get(room_name)
-            if room_values is None:
-                rooms[room_name] = room.id
-            elif isinstance(room_values, list):
-                room_values.append(room.id)
-            else:
-                # Convert from int to list
-                rooms[room_name] = [room_values, room.id]
-
-        if rooms:
-            attributes[_ATTR_ROOMS] = rooms
-
-        return attributes
+        return self._extra_state_attributes
 
     async def async_set_fan_speed(self, fan_speed: str, **kwargs: Any) -> None:
         """Set fan speed."""
-        await self._device.execute_command(self._capability.fan_speed.set(fan_speed))
+        await self._async_execute_set(self._capability.fan_speed.set(fan_speed))
 
     async def async_return_to_base(self, **kwargs: Any) -> None:
         """Set the vacuum cleaner to return to the dock."""
-        await self._device.execute_command(self._capability.charge.execute())
+        await self._commands.async_execute(self._capability.charge.execute())
 
     async def async_stop(self, **kwargs: Any) -> None:
         """Stop the vacuum cleaner."""
@@ -231,13 +258,13 @@ class DeebotVacuum(
         await self._clean_command(CleanAction.START)
 
     async def _clean_command(self, action: CleanAction) -> None:
-        await self._device.execute_command(
+        await self._commands.async_execute(
             self._capability.clean.action.command(action)
         )
 
     async def async_locate(self, **kwargs: Any) -> None:
         """Locate the vacuum cleaner."""
-        await self._device.execute_command(self._capability.play_sound.execute())
+        await self._commands.async_execute(self._capability.play_sound.execute())
 
     async def async_send_command(
         self, command: str, params: dict[str, Any] | None = None, **kwargs: Any
@@ -250,7 +277,7 @@ class DeebotVacuum(
                 raise RuntimeError("Params are required!")
 
             if command in "spot_area":
-                await self._device.execute_command(
+                await self._commands.async_execute(
                     self._capability.clean.action.area(
                         CleanMode.SPOT_AREA,
                         str(params["rooms"]),
@@ -258,7 +285,7 @@ class DeebotVacuum(
                     )
                 )
             elif command == "custom_area":
-                await self._device.execute_command(
+                await self._commands.async_execute(
                     self._capability.clean.action.area(
                         CleanMode.CUSTOM_AREA,
                         str(params["coordinates"]),
@@ -266,19 +293,28 @@ class DeebotVacuum(
                     )
                 )
         else:
-            await self._device.execute_command(
+            await self._commands.async_execute(
                 self._capability.custom.set(command, params)
             )
 
-    async def service_refresh(self, category: str) -> None:
-        """Service to manually refresh."""
-        _LOGGER.debug("Manually refresh %s", category)
-        event = REFRESH_STR_TO_EVENT_DTO.get(category, None)
-        if event:
-            self._device.events.request_refresh(event)
-        elif category == REFRESH_MAP:
-            self._device.map.refresh()
-        else:
-            _LOGGER.warning(
-                'Service "refresh" called with unknown category: %s', category
-            )
+    async def service_refresh(self, category: list[str]) -> None:
+        """Service to manually refresh.
+
+        Refreshes of data, which was just received or is already requested,
+        are skipped.
+        """
+        for name in dict.fromkeys(category):
+            _LOGGER.debug("Manually refresh %s", name)
+            if event := REFRESH_STR_TO_EVENT_DTO.get(name):
+                self._events.request_refresh(event, max_age=REFRESH_MAX_AGE)
+            elif name == REFRESH_MAP:
+                if not self._capability.map:
+                    _LOGGER.warning("Map is not supported by %s", self.entity_id)
+                    continue
+                # The map is only collected on demand and must be enabled first
+                self._device_map.async_keep_alive(self.hass, _MAP_REFRESH_KEEP_ALIVE)
+                self._device.map.refresh()
+            else:
+                _LOGGER.warning(
+                    'Service "refresh" called with unknown category: %s', name
+                )
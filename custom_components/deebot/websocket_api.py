@@ -0,0 +1,94 @@
+"""Websocket API for deebot."""
+from typing import Any
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.device_registry import DeviceEntry
+
+from .const import DOMAIN
+from .controller import DeebotController
+
+
+@callback  # type: ignore[misc]
+def async_setup(hass: HomeAssistant) -> None:
+    """Register the websocket commands."""
+    websocket_api.async_register_command(hass, websocket_map_geometry)
+    websocket_api.async_register_command(hass, websocket_subscribe_map)
+
+
+@callback  # type: ignore[misc]
+def _async_get_bot(
+    hass: HomeAssistant, device_id: str
+) -> tuple[DeebotController, DeviceEntry] | None:
+    """Return the controller and the device entry of a bot with a map."""
+    if (device := dr.async_get(hass).async_get(device_id)) is None:
+        return None
+
+    for entry_id in device.config_entries:
+        controller: DeebotController | None = hass.data.get(DOMAIN, {}).get(entry_id)
+        if (
+            controller is not None
+            and (bot := controller.get_bot(device)) is not None
+            and bot.device.capabilities.map
+        ):
+            return controller, device
+    return None
+
+
+@websocket_api.websocket_command(  # type: ignore[misc]
+    {
+        vol.Required("type"): f"{DOMAIN}/map/geometry",
+        vol.Required("device_id"): str,
+    }
+)
+@callback  # type: ignore[misc]
+def websocket_map_geometry(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Return the room polygons, dock position and map bounds of a bot."""
+    if (result := _async_get_bot(hass, msg["device_id"])) is None or (
+        geometry := result[0].get_map_geometry(result[1])
+    ) is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "No map found for the device"
+        )
+        return
+
+    connection.send_result(msg["id"], geometry)
+
+
+@websocket_api.websocket_command(  # type: ignore[misc]
+    {
+        vol.Required("type"): f"{DOMAIN}/map/subscribe",
+        vol.Required("device_id"): str,
+    }
+)
+@callback  # type: ignore[misc]
+def websocket_subscribe_map(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Stream the map changes of a bot, starting with a snapshot.
+
+    Map pieces and trace segments are passed as received from the bot,
+    base64 encoded and LZMA compressed.
+    """
+    if (result := _async_get_bot(hass, msg["device_id"])) is None or (
+        bot := result[0].get_bot(result[1])
+    ) is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "No map found for the device"
+        )
+        return
+
+    @callback  # type: ignore[misc]
+    def forward(message: dict[str, Any]) -> None:
+        connection.send_message(websocket_api.event_message(msg["id"], message))
+
+    connection.send_result(msg["id"])
+    connection.subscriptions[msg["id"]] = bot.device_map.subscribe_stream(forward)